@@ -43,7 +43,9 @@ def _init_basic_settings():
             ("date_asc", "Date (Oldest)"),
             ("date_desc", "Date (Newest)"),
             ("size_asc", "Size (Smallest)"),
-            ("size_desc", "Size (Largest)")
+            ("size_desc", "Size (Largest)"),
+            ("duration_asc", "Duration (Shortest)"),
+            ("duration_desc", "Duration (Longest)")
         ])
     
     if not hasattr(cfg, 'default_resume_action'):
@@ -132,6 +134,32 @@ def _init_advanced_settings():
     if not hasattr(cfg, 'cache_directory_listings'):
         cfg.cache_directory_listings = ConfigYesNo(default=True)
     
+    if not hasattr(cfg, 'thumb_mode'):
+        cfg.thumb_mode = ConfigSelection(default="fast", choices=[
+            ("fast", "Fast (nearest keyframe)"),
+            ("accurate", "Accurate (exact frame)")
+        ])
+    
+    if not hasattr(cfg, 'thumb_workers'):
+        cfg.thumb_workers = ConfigSelection(default="auto", choices=[
+            ("auto", "Auto (CPU count)"),
+            ("1", "1"),
+            ("2", "2"),
+            ("3", "3"),
+            ("4", "4")
+        ])
+    
+    if not hasattr(cfg, 'thumb_content_keys'):
+        cfg.thumb_content_keys = ConfigYesNo(default=False)
+    
+    if not hasattr(cfg, 'resume_flush_interval'):
+        cfg.resume_flush_interval = ConfigSelection(default="15", choices=[
+            ("5", "5 seconds"),
+            ("15", "15 seconds"),
+            ("30", "30 seconds"),
+            ("60", "60 seconds")
+        ])
+    
     if not hasattr(cfg, 'debug_mode'):
         cfg.debug_mode = ConfigYesNo(default=False)
 
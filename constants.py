@@ -38,7 +38,9 @@ SORT_KEYS = {
     "date_asc": ("Date (Oldest)", False),
     "date_desc": ("Date (Newest)", True),
     "size_asc": ("Size (Smallest)", False),
-    "size_desc": ("Size (Largest)", True)
+    "size_desc": ("Size (Largest)", True),
+    "duration_asc": ("Duration (Shortest)", False),
+    "duration_desc": ("Duration (Longest)", True)
 }
 
 # Media paths detection
@@ -82,8 +84,17 @@ DB_PATHS = [
 
 # Cache settings
 CACHE_TTL = 3600  # 1 hour
+CACHE_MAX_DIRS = 512                    # Directory listings kept in memory
+CACHE_MAX_DIR_BYTES = 6 * 1024 * 1024   # Approx. memory budget for listings
+CACHE_MAX_META = 2048                   # Metadata entries kept in memory
+CACHE_MAX_META_BYTES = 2 * 1024 * 1024  # Approx. memory budget for metadata
 CACHE_DIR = "/hdd/.modernmedia_cache"
 THUMB_CACHE_DIR = "/hdd/.modernmedia_thumbs"
+THUMB_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Thumbnail cache budget (LRU)
+POSTER_CACHE_MAX = 24                      # Decoded posters kept in memory
+POSTER_CACHE_MAX_BYTES = 12 * 1024 * 1024  # Memory budget for decoded posters
+PATH_ID_CACHE_MAX = 4096                   # Interned path ids kept in memory
+PATH_ID_CACHE_MAX_BYTES = 1024 * 1024      # Memory budget for path ids
 
 # Logging
 LOG_DIR = "/tmp/modernmedia"
@@ -5,7 +5,18 @@
 import sqlite3
 import os
 import threading
+from contextlib import contextmanager
 from ..constants import DB_PATHS
+from .migrations import run_migrations
+
+# SQLite builds on older images limit bound parameters to 999
+SQL_BATCH_SIZE = 500
+
+def iter_chunks(items, size=SQL_BATCH_SIZE):
+    """Split a sequence into lists of at most size items"""
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 def get_db_path():
     """Find writable database path"""
@@ -33,6 +44,11 @@ class DatabaseManager:
     """
     Main database manager
     Provides access to all database operations through modules
+    
+    Reads run on a connection owned by the calling thread (query /
+    query_one), so WAL readers never wait for each other or for a write.
+    Every write, including the write-behind flushes, goes through the
+    single writer connection (transaction), serialized by self.lock.
     """
     
     def __init__(self):
@@ -40,26 +56,38 @@ class DatabaseManager:
         self.conn = None
         self.cursor = None
         self.lock = threading.RLock()
+        self.local = threading.local()
+        self.readers = {}
+        self.readers_lock = threading.Lock()
         
         # Initialize connection
         self.connect()
         self.create_tables()
         
+        # Resume points and watch events are written behind
+        from .writer import WriteBehindWriter
+        self.writer = WriteBehindWriter(self)
+        self.writer.start()
+        
         # Import operation modules
+        from .paths import PathOperations
         from .resume import ResumeOperations
         from .favorites import FavoritesOperations
         from .playlists import PlaylistOperations
         from .history import HistoryOperations
         from .statistics import StatisticsOperations
         from .metadata import MetadataOperations
+        from .library import LibraryOperations
         
         # Initialize modules
+        self.paths = PathOperations(self)
         self.resume = ResumeOperations(self)
         self.favorites = FavoritesOperations(self)
         self.playlists = PlaylistOperations(self)
         self.history = HistoryOperations(self)
         self.statistics = StatisticsOperations(self)
         self.metadata = MetadataOperations(self)
+        self.library = LibraryOperations(self)
     
     def connect(self):
         """Establish database connection"""
@@ -68,150 +96,79 @@ class DatabaseManager:
             if not os.path.exists(db_dir):
                 os.makedirs(db_dir, exist_ok=True)
             
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.row_factory = sqlite3.Row
-            self.conn.text_factory = str
-            
-            # Performance settings
+            self.conn = self._open()
             self.conn.execute("PRAGMA journal_mode = WAL")
-            self.conn.execute("PRAGMA synchronous = NORMAL")
-            self.conn.execute("PRAGMA cache_size = -10000")
-            self.conn.execute("PRAGMA temp_store = MEMORY")
-            
             self.cursor = self.conn.cursor()
             print(f"[DB] Connected: {self.db_path}")
         except Exception as e:
             raise Exception(f"DB connection failed: {e}")
     
+    def _open(self, read_only=False):
+        """Open a connection with the common settings"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.text_factory = str
+        
+        # Performance settings
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA cache_size = -10000")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA busy_timeout = 5000")
+        if read_only:
+            conn.execute("PRAGMA query_only = 1")
+        return conn
+    
+    def reader(self):
+        """Read connection of the calling thread (opened on first use)"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            return conn
+        
+        conn = self._open(read_only=True)
+        self.local.conn = conn
+        
+        with self.readers_lock:
+            # Scanner threads are short-lived - close what they left behind
+            for thread, old in list(self.readers.items()):
+                if not thread.is_alive():
+                    old.close()
+                    del self.readers[thread]
+            self.readers[threading.current_thread()] = conn
+        return conn
+    
+    def query(self, sql, params=()):
+        """Run a read query on this thread's connection, return all rows"""
+        return self.reader().execute(sql, params).fetchall()
+    
+    def query_one(self, sql, params=()):
+        """Run a read query on this thread's connection, return the first row"""
+        return self.reader().execute(sql, params).fetchone()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Writer cursor for one transaction
+        Commits when the block finishes, rolls back if it raises
+        """
+        with self.lock:
+            cursor = self.conn.cursor()
+            try:
+                yield cursor
+                self.conn.commit()
+            except:
+                self.conn.rollback()
+                self.paths.end_transaction(False)
+                raise
+            self.paths.end_transaction(True)
+    
     def create_tables(self):
-        """Create all database tables"""
+        """Create or upgrade the schema (only missing migration steps run)"""
         try:
             with self.lock:
-                # Resume points
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS resume_points (
-                        file_path TEXT PRIMARY KEY,
-                        position_seconds INTEGER,
-                        file_size INTEGER,
-                        mtime REAL,
-                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # Favorites
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS favorites (
-                        file_path TEXT PRIMARY KEY,
-                        added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        profile_name TEXT DEFAULT 'default'
-                    )
-                ''')
-                
-                # Bookmarks
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS bookmarks (
-                        dir_path TEXT PRIMARY KEY,
-                        name TEXT,
-                        added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        profile_name TEXT DEFAULT 'default'
-                    )
-                ''')
-                
-                # Playlists
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS playlists (
-                        playlist_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT,
-                        created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        profile_name TEXT DEFAULT 'default'
-                    )
-                ''')
-                
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS playlist_items (
-                        playlist_id INTEGER,
-                        file_path TEXT,
-                        position INTEGER,
-                        FOREIGN KEY (playlist_id) REFERENCES playlists(playlist_id) ON DELETE CASCADE
-                    )
-                ''')
-                
-                # Recent files
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS recent_files (
-                        file_path TEXT PRIMARY KEY,
-                        played_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        profile_name TEXT DEFAULT 'default'
-                    )
-                ''')
-                
-                # Watch history
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS watch_history (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        file_path TEXT,
-                        watched_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        duration_watched INTEGER,
-                        profile_name TEXT DEFAULT 'default'
-                    )
-                ''')
-                
-                # Statistics
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS statistics (
-                        stat_date DATE,
-                        profile_name TEXT,
-                        files_watched INTEGER DEFAULT 0,
-                        total_minutes INTEGER DEFAULT 0,
-                        PRIMARY KEY (stat_date, profile_name)
-                    )
-                ''')
-                
-                # File metadata
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS file_metadata (
-                        file_path TEXT PRIMARY KEY,
-                        title TEXT,
-                        year INTEGER,
-                        genre TEXT,
-                        rating REAL,
-                        plot TEXT,
-                        poster_path TEXT,
-                        duration INTEGER,
-                        resolution TEXT,
-                        codec TEXT,
-                        metadata_source TEXT,
-                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # User profiles
-                self.cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS profiles (
-                        profile_name TEXT PRIMARY KEY,
-                        display_name TEXT,
-                        pin TEXT,
-                        created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        last_active TIMESTAMP
-                    )
-                ''')
-                
-                # Default profile
-                self.cursor.execute('''
-                    INSERT OR IGNORE INTO profiles (profile_name, display_name)
-                    VALUES ('default', 'Default User')
-                ''')
-                
-                # Indexes
-                self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_recent_date ON recent_files(played_date DESC)')
-                self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_date ON watch_history(watched_date DESC)')
-                self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_favorites_profile ON favorites(profile_name)')
-                self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_resume_updated ON resume_points(last_updated)')
-                
-                self.conn.commit()
-                print("[DB] Tables created ✓")
+                version = run_migrations(self.conn)
+                print(f"[DB] Schema v{version} ✓")
         except Exception as e:
-            raise Exception(f"Table creation failed: {e}")
+            raise Exception(f"Schema migration failed: {e}")
     
     def execute(self, query, params=()):
         """Execute query with lock"""
@@ -224,18 +181,6 @@ class DatabaseManager:
         with self.lock:
             self.conn.commit()
     
-    def optimize(self):
-        """Optimize database"""
-        try:
-            with self.lock:
-                self.cursor.execute("ANALYZE")
-                self.cursor.execute("PRAGMA optimize")
-                self.conn.commit()
-                print("[DB] Optimized ✓")
-                return True
-        except:
-            return False
-    
     def vacuum(self):
         """Vacuum database"""
         try:
@@ -269,8 +214,15 @@ class DatabaseManager:
             return False
     
     def close(self):
-        """Close database connection"""
+        """Flush pending writes and close database connection"""
         try:
+            if getattr(self, 'writer', None):
+                self.writer.stop()
+                self.writer = None
+            with self.readers_lock:
+                for conn in self.readers.values():
+                    conn.close()
+                self.readers.clear()
             if self.conn:
                 self.conn.close()
                 print("[DB] Closed")
@@ -3,6 +3,8 @@
 # ============================================================================
 
 import time
+from .connection import iter_chunks
+from .queries import FAVORITE_CHECK_SQL, FAVORITES_FILTER_SQL
 
 class FavoritesOperations:
     """Favorites database operations"""
@@ -13,48 +15,69 @@ class FavoritesOperations:
     def add(self, file_path, profile='default'):
         """Add to favorites"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    INSERT OR REPLACE INTO favorites (file_path, profile_name, added_date)
+            with self.db.transaction() as cursor:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO favorites (path_id, profile_name, added_date)
                     VALUES (?, ?, ?)
-                ''', (file_path, profile, time.time()))
-                self.db.conn.commit()
-                return True
+                ''', (self.db.paths.intern(cursor, file_path), profile, time.time()))
+            return True
         except:
             return False
     
     def remove(self, file_path):
         """Remove from favorites"""
+        path_id = self.db.paths.get_id(file_path)
+        if path_id is None:
+            return True
         try:
-            with self.db.lock:
-                self.db.cursor.execute("DELETE FROM favorites WHERE file_path = ?", (file_path,))
-                self.db.conn.commit()
-                return True
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE FROM favorites WHERE path_id = ?", (path_id,))
+            return True
         except:
             return False
     
     def is_favorite(self, file_path, profile='default'):
         """Check if file is favorite"""
+        path_id = self.db.paths.get_id(file_path)
+        if path_id is None:
+            return False
         try:
-            with self.db.lock:
-                self.db.cursor.execute(
-                    "SELECT 1 FROM favorites WHERE file_path = ? AND profile_name = ?",
-                    (file_path, profile)
-                )
-                return self.db.cursor.fetchone() is not None
+            return self.db.query_one(
+                FAVORITE_CHECK_SQL, (path_id, profile)
+            ) is not None
         except:
             return False
     
+    def filter_favorites(self, file_paths, profile='default'):
+        """
+        Check many files at once
+        
+        Returns:
+            set of the given paths that are favorites
+        """
+        favorites = set()
+        try:
+            for chunk in iter_chunks(file_paths):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.db.query(
+                    FAVORITES_FILTER_SQL.format(placeholders=placeholders),
+                    [profile] + chunk
+                )
+                favorites.update(row['path'] for row in rows)
+        except:
+            pass
+        return favorites
+    
     def get_all(self, profile='default', limit=50):
         """Get all favorites"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    SELECT file_path, added_date FROM favorites
-                    WHERE profile_name = ?
-                    ORDER BY added_date DESC LIMIT ?
-                ''', (profile, limit))
-                return [dict(row) for row in self.db.cursor.fetchall()]
+            rows = self.db.query('''
+                SELECT p.path AS file_path, f.added_date
+                FROM favorites f JOIN paths p ON p.path_id = f.path_id
+                WHERE f.profile_name = ?
+                ORDER BY f.added_date DESC LIMIT ?
+            ''', (profile, limit))
+            return [dict(row) for row in rows]
         except:
             return []
     
@@ -69,35 +92,32 @@ class FavoritesOperations:
     def add_bookmark(self, dir_path, name, profile='default'):
         """Add directory bookmark"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
+            with self.db.transaction() as cursor:
+                cursor.execute('''
                     INSERT OR REPLACE INTO bookmarks (dir_path, name, profile_name)
                     VALUES (?, ?, ?)
                 ''', (dir_path, name, profile))
-                self.db.conn.commit()
-                return True
+            return True
         except:
             return False
     
     def remove_bookmark(self, dir_path):
         """Remove bookmark"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute("DELETE FROM bookmarks WHERE dir_path = ?", (dir_path,))
-                self.db.conn.commit()
-                return True
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE FROM bookmarks WHERE dir_path = ?", (dir_path,))
+            return True
         except:
             return False
     
     def get_bookmarks(self, profile='default'):
         """Get all bookmarks"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    SELECT dir_path, name, added_date FROM bookmarks
-                    WHERE profile_name = ?
-                    ORDER BY name
-                ''', (profile,))
-                return [dict(row) for row in self.db.cursor.fetchall()]
+            rows = self.db.query('''
+                SELECT dir_path, name, added_date FROM bookmarks
+                WHERE profile_name = ?
+                ORDER BY name
+            ''', (profile,))
+            return [dict(row) for row in rows]
         except:
             return []
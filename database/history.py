@@ -3,6 +3,8 @@
 # ============================================================================
 
 import time
+from .paths import INTERN_SQL, PATH_ID_SQL
+from .queries import FILE_HISTORY_SQL
 
 class HistoryOperations:
     """Watch history and recent files operations"""
@@ -14,14 +16,14 @@ class HistoryOperations:
     def add_recent(self, file_path, profile='default'):
         """Add to recent files"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    INSERT OR REPLACE INTO recent_files (file_path, played_date, profile_name)
+            with self.db.transaction() as cursor:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO recent_files (path_id, played_date, profile_name)
                     VALUES (?, ?, ?)
-                ''', (file_path, time.time(), profile))
+                ''', (self.db.paths.intern(cursor, file_path), time.time(), profile))
                 
                 # Keep only last 50
-                self.db.cursor.execute('''
+                cursor.execute('''
                     DELETE FROM recent_files WHERE rowid IN (
                         SELECT rowid FROM recent_files 
                         WHERE profile_name = ?
@@ -29,88 +31,77 @@ class HistoryOperations:
                         LIMIT -1 OFFSET 50
                     )
                 ''', (profile,))
-                
-                self.db.conn.commit()
-                return True
+            return True
         except:
             return False
     
     def get_recent(self, profile='default', limit=20):
         """Get recent files"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    SELECT file_path, played_date FROM recent_files
-                    WHERE profile_name = ?
-                    ORDER BY played_date DESC LIMIT ?
-                ''', (profile, limit))
-                return [dict(row) for row in self.db.cursor.fetchall()]
+            rows = self.db.query('''
+                SELECT p.path AS file_path, r.played_date
+                FROM recent_files r JOIN paths p ON p.path_id = r.path_id
+                WHERE r.profile_name = ?
+                ORDER BY r.played_date DESC LIMIT ?
+            ''', (profile, limit))
+            return [dict(row) for row in rows]
         except:
             return []
     
     def clear_recent(self, profile='default'):
         """Clear recent files"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute(
+            with self.db.transaction() as cursor:
+                cursor.execute(
                     "DELETE FROM recent_files WHERE profile_name = ?",
                     (profile,)
                 )
-                self.db.conn.commit()
-                return True
+            return True
         except:
             return False
     
     # Watch history
     def add_watch(self, file_path, duration, profile='default'):
-        """Add watch history entry"""
-        try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    INSERT INTO watch_history (file_path, duration_watched, profile_name, watched_date)
-                    VALUES (?, ?, ?, ?)
-                ''', (file_path, duration, profile, time.time()))
-                
-                self.db.conn.commit()
-                return True
-        except:
-            return False
+        """Add watch history entry (written behind)"""
+        self.db.writer.queue_sql(INTERN_SQL, (file_path,))
+        self.db.writer.queue_sql(f'''
+            INSERT INTO watch_history (path_id, duration_watched, profile_name, watched_date)
+            VALUES ({PATH_ID_SQL}, ?, ?, ?)
+        ''', (file_path, duration, profile, time.time()))
+        return True
     
     def get_watch_history(self, profile='default', limit=50):
         """Get watch history"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    SELECT file_path, watched_date, duration_watched FROM watch_history
-                    WHERE profile_name = ?
-                    ORDER BY watched_date DESC LIMIT ?
-                ''', (profile, limit))
-                return [dict(row) for row in self.db.cursor.fetchall()]
+            rows = self.db.query('''
+                SELECT p.path AS file_path, w.watched_date, w.duration_watched
+                FROM watch_history w JOIN paths p ON p.path_id = w.path_id
+                WHERE w.profile_name = ?
+                ORDER BY w.watched_date DESC LIMIT ?
+            ''', (profile, limit))
+            return [dict(row) for row in rows]
         except:
             return []
     
     def get_file_history(self, file_path, profile='default'):
         """Get history for specific file"""
+        path_id = self.db.paths.get_id(file_path)
+        if path_id is None:
+            return []
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    SELECT watched_date, duration_watched FROM watch_history
-                    WHERE file_path = ? AND profile_name = ?
-                    ORDER BY watched_date DESC
-                ''', (file_path, profile))
-                return [dict(row) for row in self.db.cursor.fetchall()]
+            rows = self.db.query(FILE_HISTORY_SQL, (path_id, profile))
+            return [dict(row) for row in rows]
         except:
             return []
     
     def clear_watch_history(self, profile='default'):
         """Clear watch history"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute(
+            with self.db.transaction() as cursor:
+                cursor.execute(
                     "DELETE FROM watch_history WHERE profile_name = ?",
                     (profile,)
                 )
-                self.db.conn.commit()
-                return True
+            return True
         except:
             return False
@@ -0,0 +1,243 @@
+# ============================================================================
+# ModernMedia/database/library.py v5.0 - Media Library Index
+# ============================================================================
+
+import os
+import time
+from .connection import iter_chunks
+from .queries import LIBRARY_FILES_SQL, LIBRARY_ENTRIES_SQL
+
+def _subtree_range(dir_path):
+    """
+    Key range covering everything below dir_path
+    
+    '0' sorts right after '/', so [path/, path0) is a prefix range scan
+    on the UNIQUE path index.
+    """
+    prefix = dir_path.rstrip('/') + '/'
+    return prefix, prefix[:-1] + '0'
+
+def _norm(dir_path):
+    """Index keys never carry a trailing slash"""
+    return os.path.normpath(dir_path)
+
+def _like_pattern(query):
+    """Substring LIKE pattern in which %, _ and the escape char are literal"""
+    for char in ('\\', '%', '_'):
+        query = query.replace(char, '\\' + char)
+    return f"%{query}%"
+
+class LibraryOperations:
+    """Media library index operations (media_dirs / media_files)"""
+    
+    def __init__(self, db_manager):
+        self.db = db_manager
+    
+    def get_dir(self, dir_path):
+        """
+        Get indexed directory
+        
+        Returns:
+            dict with dir_id, parent_id, mtime or None
+        """
+        try:
+            result = self.db.query_one(
+                "SELECT dir_id, parent_id, mtime FROM media_dirs WHERE dir_path = ?",
+                (_norm(dir_path),)
+            )
+            return dict(result) if result else None
+        except:
+            return None
+    
+    def get_child_dirs(self, dir_id):
+        """Get paths of indexed subdirectories"""
+        try:
+            rows = self.db.query(
+                "SELECT dir_path FROM media_dirs WHERE parent_id = ?",
+                (dir_id,)
+            )
+            return [row['dir_path'] for row in rows]
+        except:
+            return []
+    
+    def update_dir(self, dir_path, parent_id, mtime, entries):
+        """
+        Replace the indexed contents of one directory in one transaction
+        
+        Args:
+            dir_path: Directory path
+            parent_id: dir_id of the parent (None for roots)
+            mtime: Directory mtime the listing was taken at
+            entries: scan_directory() tuples (name, path, kind, size, mtime)
+        
+        Returns:
+            dir_id or None on error
+        """
+        files = [e for e in entries if e[2] == 'file']
+        dirs = set(e[1] for e in entries if e[2] == 'dir')
+        
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO media_dirs (dir_path, parent_id, mtime, last_scanned)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(dir_path) DO UPDATE SET
+                        parent_id = excluded.parent_id,
+                        mtime = excluded.mtime,
+                        last_scanned = excluded.last_scanned
+                ''', (dir_path, parent_id, mtime, time.time()))
+                
+                cursor.execute(
+                    "SELECT dir_id FROM media_dirs WHERE dir_path = ?", (dir_path,)
+                )
+                dir_id = cursor.fetchone()['dir_id']
+                
+                # Files
+                cursor.execute(
+                    "DELETE FROM media_files WHERE parent_id = ?", (dir_id,)
+                )
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO media_files
+                    (file_path, parent_id, name, file_size, mtime)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [(path, dir_id, name, size, file_mtime)
+                      for name, path, kind, size, file_mtime in files])
+                
+                # Subdirectories that disappeared
+                cursor.execute(
+                    "SELECT dir_path FROM media_dirs WHERE parent_id = ?", (dir_id,)
+                )
+                gone = [row['dir_path'] for row in cursor.fetchall()
+                        if row['dir_path'] not in dirs]
+                for path in gone:
+                    self._delete_tree(cursor, path)
+            return dir_id
+        except Exception as e:
+            print(f"[DB] Library update error: {e}")
+            return None
+    
+    def remove_dir(self, dir_path):
+        """Remove a directory and its whole subtree from the index"""
+        try:
+            with self.db.transaction() as cursor:
+                self._delete_tree(cursor, _norm(dir_path))
+            return True
+        except:
+            return False
+    
+    def _delete_tree(self, cursor, dir_path):
+        """Delete subtree rows inside the caller's transaction"""
+        low, high = _subtree_range(dir_path)
+        cursor.execute(
+            "DELETE FROM media_files WHERE file_path >= ? AND file_path < ?",
+            (low, high)
+        )
+        cursor.execute(
+            "DELETE FROM media_dirs WHERE dir_path = ? OR (dir_path >= ? AND dir_path < ?)",
+            (dir_path, low, high)
+        )
+    
+    def patch_file(self, dir_path, file_path, entry=None):
+        """
+        Update one file of an indexed directory
+        
+        The directory mtime is left alone so the next incremental scan
+        still relists the folder and picks up anything that was missed.
+        
+        Args:
+            dir_path: Parent directory path
+            file_path: File that changed
+            entry: New scan_directory() tuple, or None if it was removed
+        
+        Returns:
+            True if the directory is indexed and was patched
+        """
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute(
+                    "SELECT dir_id FROM media_dirs WHERE dir_path = ?", (_norm(dir_path),)
+                )
+                result = cursor.fetchone()
+                if not result:
+                    return False
+                
+                if entry is None:
+                    cursor.execute(
+                        "DELETE FROM media_files WHERE file_path = ?", (file_path,)
+                    )
+                else:
+                    name, path, kind, size, mtime = entry
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO media_files
+                        (file_path, parent_id, name, file_size, mtime)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (path, result['dir_id'], name, size, mtime))
+            return True
+        except:
+            return False
+    
+    def get_files(self, dir_path):
+        """Get indexed files of one directory"""
+        try:
+            rows = self.db.query(LIBRARY_FILES_SQL, (_norm(dir_path),))
+            return [dict(row) for row in rows]
+        except:
+            return []
+    
+    def get_entries(self, file_paths):
+        """
+        Look up many indexed files at once
+        
+        Returns:
+            dict of file_path -> (file_size, mtime), only for indexed files
+        """
+        entries = {}
+        try:
+            for chunk in iter_chunks(file_paths):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.db.query(
+                    LIBRARY_ENTRIES_SQL.format(placeholders=placeholders), chunk
+                )
+                for row in rows:
+                    entries[row['file_path']] = (row['file_size'], row['mtime'])
+        except:
+            pass
+        return entries
+    
+    def search(self, query, limit=200):
+        """Search indexed files by name (% and _ match literally)"""
+        try:
+            rows = self.db.query('''
+                SELECT file_path, name, file_size, mtime FROM media_files
+                WHERE name LIKE ? ESCAPE '\\'
+                ORDER BY name
+                LIMIT ?
+            ''', (_like_pattern(query), limit))
+            return [dict(row) for row in rows]
+        except:
+            return []
+    
+    def get_stats(self):
+        """Get library totals"""
+        try:
+            files = dict(self.db.query_one('''
+                SELECT COUNT(*) as total_files,
+                       COALESCE(SUM(file_size), 0) as total_size
+                FROM media_files
+            '''))
+            files['total_dirs'] = self.db.query_one(
+                "SELECT COUNT(*) as total_dirs FROM media_dirs"
+            )['total_dirs']
+            return files
+        except:
+            return {'total_files': 0, 'total_size': 0, 'total_dirs': 0}
+    
+    def clear(self):
+        """Drop the whole index"""
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE FROM media_files")
+                cursor.execute("DELETE FROM media_dirs")
+            return True
+        except:
+            return False
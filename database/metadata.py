@@ -2,6 +2,24 @@
 # ModernMedia/database/metadata.py v5.0 - Metadata Operations
 # ============================================================================
 
+from .connection import iter_chunks
+from .queries import METADATA_PROBE_STATES_SQL, METADATA_DURATIONS_SQL
+
+# Columns set() may write, by metadata dict key
+SET_COLUMNS = (
+    ('title', 'title'), ('year', 'year'), ('genre', 'genre'),
+    ('rating', 'rating'), ('plot', 'plot'), ('poster_path', 'poster_path'),
+    ('duration', 'duration'), ('resolution', 'resolution'), ('codec', 'codec'),
+    ('source', 'metadata_source'),
+)
+
+# Public row layout, file_path instead of the internal path_id
+COLUMNS = '''
+    p.path AS file_path, m.title, m.year, m.genre, m.rating, m.plot,
+    m.poster_path, m.duration, m.resolution, m.codec, m.metadata_source,
+    m.last_updated, m.file_size, m.mtime
+'''
+
 class MetadataOperations:
     """File metadata operations"""
     
@@ -12,117 +30,191 @@ class MetadataOperations:
         """
         Set file metadata
         
+        Only the given keys are written, other columns of an existing row
+        (probe results and their size/mtime) are kept.
+        
         Args:
             file_path: Path to file
             metadata: dict with keys: title, year, genre, rating, plot,
                      poster_path, duration, resolution, codec, source
         """
+        metadata = dict(metadata)
+        metadata.setdefault('source', 'manual')
+        columns = [(key, column) for key, column in SET_COLUMNS if key in metadata]
+        names = ", ".join(column for _, column in columns)
+        updates = ", ".join(f"{column} = excluded.{column}" for _, column in columns)
+        
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    INSERT OR REPLACE INTO file_metadata 
-                    (file_path, title, year, genre, rating, plot, poster_path, 
-                     duration, resolution, codec, metadata_source)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    file_path,
-                    metadata.get('title'),
-                    metadata.get('year'),
-                    metadata.get('genre'),
-                    metadata.get('rating'),
-                    metadata.get('plot'),
-                    metadata.get('poster_path'),
-                    metadata.get('duration'),
-                    metadata.get('resolution'),
-                    metadata.get('codec'),
-                    metadata.get('source', 'manual')
-                ))
-                self.db.conn.commit()
-                return True
+            with self.db.transaction() as cursor:
+                cursor.execute(f'''
+                    INSERT INTO file_metadata (path_id, {names})
+                    VALUES (?{", ?" * len(columns)})
+                    ON CONFLICT(path_id) DO UPDATE SET
+                        {updates}, last_updated = CURRENT_TIMESTAMP
+                ''', [self.db.paths.intern(cursor, file_path)] +
+                     [metadata[key] for key, _ in columns])
+            return True
         except:
             return False
     
     def get(self, file_path):
         """Get file metadata"""
+        path_id = self.db.paths.get_id(file_path)
+        if path_id is None:
+            return None
         try:
-            with self.db.lock:
-                self.db.cursor.execute(
-                    'SELECT * FROM file_metadata WHERE file_path = ?',
-                    (file_path,)
-                )
-                result = self.db.cursor.fetchone()
-                return dict(result) if result else None
+            result = self.db.query_one(
+                f"SELECT {COLUMNS} FROM file_metadata m JOIN paths p ON p.path_id = m.path_id "
+                "WHERE m.path_id = ?",
+                (path_id,)
+            )
+            return dict(result) if result else None
         except:
             return None
     
     def delete(self, file_path):
         """Delete file metadata"""
+        path_id = self.db.paths.get_id(file_path)
+        if path_id is None:
+            return True
         try:
-            with self.db.lock:
-                self.db.cursor.execute(
-                    "DELETE FROM file_metadata WHERE file_path = ?",
-                    (file_path,)
+            with self.db.transaction() as cursor:
+                cursor.execute(
+                    "DELETE FROM file_metadata WHERE path_id = ?",
+                    (path_id,)
                 )
-                self.db.conn.commit()
-                return True
+            return True
         except:
             return False
     
+    def set_probe_many(self, results):
+        """
+        Store ffprobe results in one transaction
+        
+        Only the technical columns are written, titles, plots and other
+        scraped fields of existing rows are kept.
+        
+        Args:
+            results: list of dicts with keys: file_path, file_size, mtime,
+                     duration, resolution, codec
+        """
+        try:
+            with self.db.transaction() as cursor:
+                ids = self.db.paths.intern_many(cursor, [r['file_path'] for r in results])
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO file_metadata (path_id, metadata_source) "
+                    "VALUES (?, 'ffprobe')",
+                    [(ids[r['file_path']],) for r in results]
+                )
+                cursor.executemany('''
+                    UPDATE file_metadata
+                    SET duration = ?, resolution = ?, codec = ?,
+                        file_size = ?, mtime = ?, last_updated = CURRENT_TIMESTAMP
+                    WHERE path_id = ?
+                ''', [
+                    (r.get('duration'), r.get('resolution'), r.get('codec'),
+                     r['file_size'], r['mtime'], ids[r['file_path']])
+                    for r in results
+                ])
+            return True
+        except Exception as e:
+            print(f"[DB] Probe store error: {e}")
+            return False
+    
+    def get_probe_states(self, file_paths):
+        """
+        Get size and mtime each file was last probed at
+        
+        Returns:
+            dict of file_path -> (file_size, mtime)
+        """
+        states = {}
+        try:
+            for chunk in iter_chunks(file_paths):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.db.query(
+                    METADATA_PROBE_STATES_SQL.format(placeholders=placeholders), chunk
+                )
+                for row in rows:
+                    states[row['file_path']] = (row['file_size'], row['mtime'])
+        except:
+            pass
+        return states
+    
+    def get_durations(self, file_paths):
+        """
+        Get known durations for many files at once
+        
+        Returns:
+            dict of file_path -> duration in seconds
+        """
+        durations = {}
+        try:
+            for chunk in iter_chunks(file_paths):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.db.query(
+                    METADATA_DURATIONS_SQL.format(placeholders=placeholders), chunk
+                )
+                for row in rows:
+                    durations[row['file_path']] = row['duration']
+        except:
+            pass
+        return durations
+    
     def search(self, query, limit=50):
         """Search metadata by title or genre"""
         try:
-            with self.db.lock:
-                search_term = f"%{query}%"
-                self.db.cursor.execute('''
-                    SELECT * FROM file_metadata
-                    WHERE title LIKE ? OR genre LIKE ? OR plot LIKE ?
-                    ORDER BY title
-                    LIMIT ?
-                ''', (search_term, search_term, search_term, limit))
-                
-                return [dict(row) for row in self.db.cursor.fetchall()]
+            search_term = f"%{query}%"
+            rows = self.db.query(f'''
+                SELECT {COLUMNS}
+                FROM file_metadata m JOIN paths p ON p.path_id = m.path_id
+                WHERE m.title LIKE ? OR m.genre LIKE ? OR m.plot LIKE ?
+                ORDER BY m.title
+                LIMIT ?
+            ''', (search_term, search_term, search_term, limit))
+            
+            return [dict(row) for row in rows]
         except:
             return []
     
     def get_by_genre(self, genre, limit=50):
         """Get files by genre"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    SELECT * FROM file_metadata
-                    WHERE genre LIKE ?
-                    ORDER BY rating DESC, title
-                    LIMIT ?
-                ''', (f"%{genre}%", limit))
-                
-                return [dict(row) for row in self.db.cursor.fetchall()]
+            rows = self.db.query(f'''
+                SELECT {COLUMNS}
+                FROM file_metadata m JOIN paths p ON p.path_id = m.path_id
+                WHERE m.genre LIKE ?
+                ORDER BY m.rating DESC, m.title
+                LIMIT ?
+            ''', (f"%{genre}%", limit))
+            
+            return [dict(row) for row in rows]
         except:
             return []
     
     def get_by_year(self, year, limit=50):
         """Get files by year"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    SELECT * FROM file_metadata
-                    WHERE year = ?
-                    ORDER BY rating DESC, title
-                    LIMIT ?
-                ''', (year, limit))
-                
-                return [dict(row) for row in self.db.cursor.fetchall()]
+            rows = self.db.query(f'''
+                SELECT {COLUMNS}
+                FROM file_metadata m JOIN paths p ON p.path_id = m.path_id
+                WHERE m.year = ?
+                ORDER BY m.rating DESC, m.title
+                LIMIT ?
+            ''', (year, limit))
+            
+            return [dict(row) for row in rows]
         except:
             return []
     
     def get_all_genres(self):
         """Get list of all genres"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    SELECT DISTINCT genre FROM file_metadata
-                    WHERE genre IS NOT NULL
-                    ORDER BY genre
-                ''')
-                return [row['genre'] for row in self.db.cursor.fetchall()]
+            rows = self.db.query('''
+                SELECT DISTINCT genre FROM file_metadata
+                WHERE genre IS NOT NULL
+                ORDER BY genre
+            ''')
+            return [row['genre'] for row in rows]
         except:
             return []
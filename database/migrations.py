@@ -0,0 +1,353 @@
+# ============================================================================
+# ModernMedia/database/migrations.py v5.0 - Schema Migrations
+# ============================================================================
+
+def _add_columns(cursor, table, columns):
+    """Add columns missing from a table (safe to repeat)"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cursor.fetchall()}
+    
+    for name, col_type in columns:
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+
+def _v1_base_schema(cursor):
+    """Core tables of v5.0 (IF NOT EXISTS - older installs already have them)"""
+    # Resume points
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resume_points (
+            file_path TEXT PRIMARY KEY,
+            position_seconds INTEGER,
+            file_size INTEGER,
+            mtime REAL,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Favorites
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS favorites (
+            file_path TEXT PRIMARY KEY,
+            added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            profile_name TEXT DEFAULT 'default'
+        )
+    ''')
+    
+    # Bookmarks
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bookmarks (
+            dir_path TEXT PRIMARY KEY,
+            name TEXT,
+            added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            profile_name TEXT DEFAULT 'default'
+        )
+    ''')
+    
+    # Playlists
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS playlists (
+            playlist_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            profile_name TEXT DEFAULT 'default'
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS playlist_items (
+            playlist_id INTEGER,
+            file_path TEXT,
+            position INTEGER,
+            FOREIGN KEY (playlist_id) REFERENCES playlists(playlist_id) ON DELETE CASCADE
+        )
+    ''')
+    
+    # Recent files
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recent_files (
+            file_path TEXT PRIMARY KEY,
+            played_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            profile_name TEXT DEFAULT 'default'
+        )
+    ''')
+    
+    # Watch history
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS watch_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_path TEXT,
+            watched_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_watched INTEGER,
+            profile_name TEXT DEFAULT 'default'
+        )
+    ''')
+    
+    # Statistics
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS statistics (
+            stat_date DATE,
+            profile_name TEXT,
+            files_watched INTEGER DEFAULT 0,
+            total_minutes INTEGER DEFAULT 0,
+            PRIMARY KEY (stat_date, profile_name)
+        )
+    ''')
+    
+    # File metadata
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS file_metadata (
+            file_path TEXT PRIMARY KEY,
+            title TEXT,
+            year INTEGER,
+            genre TEXT,
+            rating REAL,
+            plot TEXT,
+            poster_path TEXT,
+            duration INTEGER,
+            resolution TEXT,
+            codec TEXT,
+            metadata_source TEXT,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # User profiles
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS profiles (
+            profile_name TEXT PRIMARY KEY,
+            display_name TEXT,
+            pin TEXT,
+            created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_active TIMESTAMP
+        )
+    ''')
+    
+    # Default profile
+    cursor.execute('''
+        INSERT OR IGNORE INTO profiles (profile_name, display_name)
+        VALUES ('default', 'Default User')
+    ''')
+    
+    # Indexes
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recent_date ON recent_files(played_date DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_date ON watch_history(watched_date DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_favorites_profile ON favorites(profile_name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_resume_updated ON resume_points(last_updated)')
+
+def _v2_library_index(cursor):
+    """Media library index (media_dirs / media_files)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS media_dirs (
+            dir_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dir_path TEXT UNIQUE,
+            parent_id INTEGER,
+            mtime REAL,
+            last_scanned TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS media_files (
+            file_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_path TEXT UNIQUE,
+            parent_id INTEGER,
+            name TEXT,
+            file_size INTEGER,
+            mtime REAL
+        )
+    ''')
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_media_dirs_parent ON media_dirs(parent_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_media_files_parent ON media_files(parent_id)')
+
+def _v3_probe_columns(cursor):
+    """Size/mtime a file was probed at, to skip unchanged files"""
+    _add_columns(cursor, 'file_metadata', (
+        ('file_size', 'INTEGER'),
+        ('mtime', 'REAL')
+    ))
+
+def _v4_hot_query_indexes(cursor):
+    """Covering indexes for per-file history, most watched and playlist items"""
+    # get_file_history: file + profile, newest first
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_history_file
+        ON watch_history(file_path, profile_name, watched_date, duration_watched)
+    ''')
+    
+    # get_most_watched: profile filter, GROUP BY file_path, SUM(duration_watched)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_history_profile_file
+        ON watch_history(profile_name, file_path, duration_watched)
+    ''')
+    
+    # get_items / next position: one playlist in position order
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_playlist_items
+        ON playlist_items(playlist_id, position, file_path)
+    ''')
+
+def _rebuild(cursor, table, create_sql, columns):
+    """
+    Recreate a table with path_id in place of file_path
+    
+    columns: the other columns, copied over unchanged
+    """
+    cursor.execute(create_sql.replace(f"TABLE {table} ", f"TABLE {table}_new ", 1))
+    cols = ", ".join(columns)
+    old_cols = ", ".join(f"t.{c}" for c in columns)
+    cursor.execute(f'''
+        INSERT INTO {table}_new (path_id, {cols})
+        SELECT p.path_id, {old_cols}
+        FROM {table} t JOIN paths p ON p.path = t.file_path
+    ''')
+    cursor.execute(f"DROP TABLE {table}")
+    cursor.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+def _v5_path_ids(cursor):
+    """Store file paths once in paths, other tables reference path_id"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS paths (
+            path_id INTEGER PRIMARY KEY,
+            path TEXT UNIQUE NOT NULL
+        )
+    ''')
+    
+    tables = ('resume_points', 'favorites', 'recent_files',
+              'watch_history', 'playlist_items', 'file_metadata')
+    for table in tables:
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO paths (path)
+            SELECT DISTINCT file_path FROM {table} WHERE file_path IS NOT NULL
+        ''')
+    
+    _rebuild(cursor, 'resume_points', '''
+        CREATE TABLE resume_points (
+            path_id INTEGER PRIMARY KEY,
+            position_seconds INTEGER,
+            file_size INTEGER,
+            mtime REAL,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''', ('position_seconds', 'file_size', 'mtime', 'last_updated'))
+    
+    _rebuild(cursor, 'favorites', '''
+        CREATE TABLE favorites (
+            path_id INTEGER PRIMARY KEY,
+            added_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            profile_name TEXT DEFAULT 'default'
+        )
+    ''', ('added_date', 'profile_name'))
+    
+    _rebuild(cursor, 'recent_files', '''
+        CREATE TABLE recent_files (
+            path_id INTEGER PRIMARY KEY,
+            played_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            profile_name TEXT DEFAULT 'default'
+        )
+    ''', ('played_date', 'profile_name'))
+    
+    _rebuild(cursor, 'watch_history', '''
+        CREATE TABLE watch_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path_id INTEGER,
+            watched_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_watched INTEGER,
+            profile_name TEXT DEFAULT 'default'
+        )
+    ''', ('id', 'watched_date', 'duration_watched', 'profile_name'))
+    
+    _rebuild(cursor, 'playlist_items', '''
+        CREATE TABLE playlist_items (
+            playlist_id INTEGER,
+            path_id INTEGER,
+            position INTEGER,
+            FOREIGN KEY (playlist_id) REFERENCES playlists(playlist_id) ON DELETE CASCADE
+        )
+    ''', ('playlist_id', 'position'))
+    
+    _rebuild(cursor, 'file_metadata', '''
+        CREATE TABLE file_metadata (
+            path_id INTEGER PRIMARY KEY,
+            title TEXT,
+            year INTEGER,
+            genre TEXT,
+            rating REAL,
+            plot TEXT,
+            poster_path TEXT,
+            duration INTEGER,
+            resolution TEXT,
+            codec TEXT,
+            metadata_source TEXT,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            file_size INTEGER,
+            mtime REAL
+        )
+    ''', ('title', 'year', 'genre', 'rating', 'plot', 'poster_path', 'duration',
+          'resolution', 'codec', 'metadata_source', 'last_updated',
+          'file_size', 'mtime'))
+    
+    # DROP TABLE took the old indexes along
+    cursor.execute('CREATE INDEX idx_recent_date ON recent_files(played_date DESC)')
+    cursor.execute('CREATE INDEX idx_history_date ON watch_history(watched_date DESC)')
+    cursor.execute('CREATE INDEX idx_favorites_profile ON favorites(profile_name)')
+    cursor.execute('CREATE INDEX idx_resume_updated ON resume_points(last_updated)')
+    cursor.execute('''
+        CREATE INDEX idx_history_file
+        ON watch_history(path_id, profile_name, watched_date, duration_watched)
+    ''')
+    cursor.execute('''
+        CREATE INDEX idx_history_profile_file
+        ON watch_history(profile_name, path_id, duration_watched)
+    ''')
+    cursor.execute('''
+        CREATE INDEX idx_playlist_items
+        ON playlist_items(playlist_id, position, path_id)
+    ''')
+
+# Ordered steps - the database's user_version is the number already applied.
+# Never edit or reorder a released step, append a new one instead.
+MIGRATIONS = [
+    _v1_base_schema,
+    _v2_library_index,
+    _v3_probe_columns,
+    _v4_hot_query_indexes,
+    _v5_path_ids,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def get_version(conn):
+    """Schema version stored in the database"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def run_migrations(conn):
+    """
+    Apply the missing migration steps in one transaction
+    
+    An up-to-date database only costs a PRAGMA read. On failure the
+    transaction is rolled back and the version stays untouched.
+    
+    Returns:
+        Schema version after the upgrade
+    """
+    version = get_version(conn)
+    if version >= SCHEMA_VERSION:
+        if version > SCHEMA_VERSION:
+            print(f"[DB] Schema v{version} is newer than this version (v{SCHEMA_VERSION})")
+        return version
+    
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN")
+        for step in MIGRATIONS[version:]:
+            step(cursor)
+        # PRAGMA does not take bound parameters
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    except:
+        conn.rollback()
+        raise
+    
+    print(f"[DB] Schema upgraded v{version} -> v{SCHEMA_VERSION}")
+    return SCHEMA_VERSION
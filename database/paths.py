@@ -0,0 +1,157 @@
+# ============================================================================
+# ModernMedia/database/paths.py v5.0 - Path Interning
+# ============================================================================
+
+import threading
+from ..constants import PATH_ID_CACHE_MAX, PATH_ID_CACHE_MAX_BYTES
+from ..utils.cache import BoundedLRU, estimate_size
+from .connection import iter_chunks
+from .queries import PATH_ID_LOOKUP_SQL
+
+# For connections without a PathOperations (write-behind writer):
+# run INTERN_SQL first, then reference PATH_ID_SQL in place of the id
+INTERN_SQL = "INSERT OR IGNORE INTO paths (path) VALUES (?)"
+PATH_ID_SQL = "(SELECT path_id FROM paths WHERE path = ?)"
+
+# Tables whose rows reference paths.path_id
+PATH_TABLES = ('resume_points', 'favorites', 'recent_files',
+               'watch_history', 'playlist_items', 'file_metadata')
+
+ORPHANS_SQL = "DELETE FROM paths WHERE path_id NOT IN ({})".format(
+    " UNION ".join(f"SELECT path_id FROM {t} WHERE path_id IS NOT NULL" for t in PATH_TABLES)
+)
+
+class PathOperations:
+    """
+    File path <-> integer id mapping (paths table)
+    
+    Ids are only deleted by cleanup() once no table references them.
+    The cache is dropped when that transaction commits, and lookups that
+    raced with it are not cached (generation check).
+    """
+    
+    def __init__(self, db_manager):
+        self.db = db_manager
+        self.cache = BoundedLRU(PATH_ID_CACHE_MAX, PATH_ID_CACHE_MAX_BYTES)
+        self.lock = threading.Lock()
+        self.pending = {}    # interned by the running transaction (under db.lock)
+        self.swept = False   # running transaction deleted orphans (under db.lock)
+        self.generation = 0  # bumped whenever ids may have been deleted
+        self.hits = 0
+        self.misses = 0
+    
+    def _cached(self, path):
+        with self.lock:
+            path_id = self.cache.get(path)
+            if path_id is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return path_id
+    
+    def _remember(self, path, path_id, generation=None):
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.cache.set(path, path_id, estimate_size(path) + 28)
+    
+    def get_id(self, path):
+        """
+        Look up the id of a path without creating it
+        
+        Returns:
+            path_id or None if the path was never stored
+        """
+        path_id = self._cached(path)
+        if path_id is not None:
+            return path_id
+        
+        generation = self.generation
+        try:
+            row = self.db.query_one(PATH_ID_LOOKUP_SQL, (path,))
+        except:
+            return None
+        if row is None:
+            return None
+        
+        self._remember(path, row['path_id'], generation)
+        return row['path_id']
+    
+    def intern(self, cursor, path):
+        """
+        Get or create the id of a path inside the caller's transaction
+        
+        Returns:
+            path_id
+        """
+        return self.intern_many(cursor, [path])[path]
+    
+    def intern_many(self, cursor, paths):
+        """
+        Get or create the ids of many paths inside the caller's transaction
+        
+        Returns:
+            dict of path -> path_id
+        """
+        ids = {}
+        missing = []
+        for path in set(paths):
+            path_id = self.pending.get(path) or self._cached(path)
+            if path_id is None:
+                missing.append(path)
+            else:
+                ids[path] = path_id
+        
+        if missing:
+            cursor.executemany(INTERN_SQL, [(p,) for p in missing])
+            found = self._select_ids(cursor, missing)
+            # Cached only once the transaction commits, a rolled back
+            # insert frees its id for reuse
+            self.pending.update(found)
+            ids.update(found)
+        return ids
+    
+    def cleanup(self, cursor):
+        """
+        Delete paths no table references any more, inside the caller's
+        transaction
+        
+        Returns:
+            Number of deleted paths
+        """
+        cursor.execute(ORPHANS_SQL)
+        self.swept = True
+        return cursor.rowcount
+    
+    def end_transaction(self, committed):
+        """Publish (or drop) ids interned by the finished transaction"""
+        pending, self.pending = self.pending, {}
+        swept, self.swept = self.swept, False
+        if committed:
+            for path, path_id in pending.items():
+                self._remember(path, path_id)
+            if swept:
+                with self.lock:
+                    self.cache.clear()
+                    self.generation += 1
+    
+    def _select_ids(self, cursor, paths):
+        ids = {}
+        for chunk in iter_chunks(paths):
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(
+                f"SELECT path, path_id FROM paths WHERE path IN ({placeholders})",
+                chunk
+            )
+            for row in cursor.fetchall():
+                ids[row['path']] = row['path_id']
+        return ids
+    
+    def get_stats(self):
+        """Cache statistics"""
+        with self.lock:
+            return {
+                'cached': len(self.cache),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
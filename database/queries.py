@@ -0,0 +1,81 @@
+# ============================================================================
+# ModernMedia/database/queries.py v5.0 - Hot Query SQL
+# ============================================================================
+
+# Statements on the browsing / playback paths, shared by the *Operations
+# classes and tests/test_query_plans.py (every *_SQL here must SEARCH an
+# index, never SCAN a table). IN lists are filled in via {placeholders}.
+
+PATH_ID_LOOKUP_SQL = "SELECT path_id FROM paths WHERE path = ?"
+
+RESUME_GET_MANY_SQL = (
+    "SELECT p.path AS file_path, r.position_seconds, r.file_size, r.mtime "
+    "FROM paths p JOIN resume_points r ON r.path_id = p.path_id "
+    "WHERE p.path IN ({placeholders})"
+)
+
+FAVORITE_CHECK_SQL = (
+    "SELECT 1 FROM favorites WHERE path_id = ? AND profile_name = ?"
+)
+
+FAVORITES_FILTER_SQL = (
+    "SELECT p.path FROM paths p JOIN favorites f ON f.path_id = p.path_id "
+    "WHERE f.profile_name = ? AND p.path IN ({placeholders})"
+)
+
+FILE_HISTORY_SQL = '''
+    SELECT watched_date, duration_watched FROM watch_history
+    WHERE path_id = ? AND profile_name = ?
+    ORDER BY watched_date DESC
+'''
+
+# Aggregate on ids, paths are only looked up for the top rows
+MOST_WATCHED_SQL = '''
+    SELECT p.path AS file_path, w.watch_count, w.total_time
+    FROM (
+        SELECT path_id, COUNT(*) as watch_count,
+               SUM(duration_watched) as total_time
+        FROM watch_history
+        WHERE profile_name = ?
+        GROUP BY path_id
+        ORDER BY watch_count DESC, total_time DESC
+        LIMIT ?
+    ) w JOIN paths p ON p.path_id = w.path_id
+    ORDER BY w.watch_count DESC, w.total_time DESC
+'''
+
+PLAYLIST_ITEMS_SQL = '''
+    SELECT p.path AS file_path, i.position
+    FROM playlist_items i JOIN paths p ON p.path_id = i.path_id
+    WHERE i.playlist_id = ?
+    ORDER BY i.position
+'''
+
+PLAYLIST_NEXT_POSITION_SQL = '''
+    SELECT COALESCE(MAX(position), -1) + 1 as next_pos
+    FROM playlist_items WHERE playlist_id = ?
+'''
+
+METADATA_PROBE_STATES_SQL = (
+    "SELECT p.path AS file_path, m.file_size, m.mtime "
+    "FROM paths p JOIN file_metadata m ON m.path_id = p.path_id "
+    "WHERE p.path IN ({placeholders}) AND m.file_size IS NOT NULL"
+)
+
+METADATA_DURATIONS_SQL = (
+    "SELECT p.path AS file_path, m.duration "
+    "FROM paths p JOIN file_metadata m ON m.path_id = p.path_id "
+    "WHERE p.path IN ({placeholders}) AND m.duration > 0"
+)
+
+LIBRARY_FILES_SQL = '''
+    SELECT f.file_path, f.name, f.file_size, f.mtime
+    FROM media_files f JOIN media_dirs d ON f.parent_id = d.dir_id
+    WHERE d.dir_path = ?
+    ORDER BY f.name
+'''
+
+LIBRARY_ENTRIES_SQL = (
+    "SELECT file_path, file_size, mtime FROM media_files "
+    "WHERE file_path IN ({placeholders})"
+)
@@ -3,6 +3,11 @@
 # ============================================================================
 
 import time
+from .connection import iter_chunks
+from .queries import RESUME_GET_MANY_SQL
+
+# Allowed mtime drift before a resume point is considered stale
+MTIME_TOLERANCE = 2.0
 
 class ResumeOperations:
     """Resume point database operations"""
@@ -12,88 +17,159 @@ class ResumeOperations:
     
     def get(self, file_path, current_size, current_mtime):
         """
-        Get resume data with validation
+        Get resume data with validation (pending writes included)
         
         Returns:
             dict or None
         """
+        return self.get_many({file_path: (current_size, current_mtime)}).get(file_path)
+    
+    def get_many(self, files):
+        """
+        Get resume data for many files at once with validation
+        
+        Positions still waiting in the write-behind queue take precedence
+        over the stored ones.
+        
+        Args:
+            files: dict of file_path -> (current_size, current_mtime)
+        
+        Returns:
+            dict of file_path -> resume dict, only for valid resume points.
+            Stale points are deleted in a single transaction.
+        """
+        rows = {}
+        found = {}
+        stale = []
+        
         try:
-            with self.db.lock:
-                self.db.cursor.execute(
-                    "SELECT position_seconds, file_size, mtime FROM resume_points WHERE file_path = ?",
-                    (file_path,)
-                )
-                result = self.db.cursor.fetchone()
+            # Taken before reading so a flush in between loses nothing
+            pending = self.db.writer.pending_resume(files)
+            
+            for chunk in iter_chunks(files):
+                placeholders = ",".join("?" * len(chunk))
+                for row in self.db.query(
+                    RESUME_GET_MANY_SQL.format(placeholders=placeholders), chunk
+                ):
+                    rows[row['file_path']] = (
+                        row['position_seconds'], row['file_size'], row['mtime']
+                    )
+            
+            for file_path, value in pending.items():
+                if value is None:
+                    rows.pop(file_path, None)
+                else:
+                    rows[file_path] = value[:3]
+            
+            for file_path, (position, file_size, mtime) in rows.items():
+                current_size, current_mtime = files[file_path]
                 
-                if not result:
-                    return None
+                if file_size != current_size or \
+                   abs(mtime - current_mtime) > MTIME_TOLERANCE:
+                    stale.append(file_path)
+                    continue
                 
-                db_data = {
-                    'position_seconds': result['position_seconds'],
-                    'file_size': result['file_size'],
-                    'mtime': result['mtime'],
+                found[file_path] = {
+                    'position_seconds': position,
+                    'file_size': file_size,
+                    'mtime': mtime,
                 }
-                
-                # Validate file hasn't changed
-                mtime_tolerance = 2.0
-                if db_data['file_size'] != current_size or \
-                   abs(db_data['mtime'] - current_mtime) > mtime_tolerance:
-                    # File changed - delete old resume
-                    self.delete(file_path)
-                    return None
-                
-                return db_data
+            
+            if stale:
+                self.delete_many(stale)
         except Exception as e:
-            print(f"[DB] Get resume error: {e}")
-            return None
+            print(f"[DB] Get resume batch error: {e}")
+        
+        return found
     
     def set(self, file_path, position_seconds, file_size, mtime):
-        """Save resume position"""
-        try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    INSERT OR REPLACE INTO resume_points
-                    (file_path, position_seconds, file_size, mtime, last_updated)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (file_path, position_seconds, file_size, mtime, time.time()))
-                self.db.conn.commit()
-                return True
-        except Exception as e:
-            print(f"[DB] Set resume error: {e}")
-            return False
+        """Save resume position (written behind, see WriteBehindWriter)"""
+        self.db.writer.queue_resume(file_path, position_seconds, file_size, mtime)
+        return True
     
     def delete(self, file_path):
-        """Delete resume point"""
+        """Delete resume point (True if there was one)"""
+        return self.delete_many([file_path]) > 0
+    
+    def delete_many(self, file_paths):
+        """
+        Delete several resume points (written behind)
+        
+        Returns:
+            Number of resume points that existed, pending ones included
+        """
+        file_paths = list(file_paths)
+        existing = set()
         try:
-            with self.db.lock:
-                self.db.cursor.execute("DELETE FROM resume_points WHERE file_path = ?", (file_path,))
-                self.db.conn.commit()
-                return self.db.cursor.rowcount > 0
-        except:
-            return False
+            pending = self.db.writer.pending_resume(file_paths)
+            existing.update(p for p, v in pending.items() if v is not None)
+            
+            stored = [p for p in file_paths if p not in pending]
+            for chunk in iter_chunks(stored):
+                placeholders = ",".join("?" * len(chunk))
+                for row in self.db.query(
+                    RESUME_GET_MANY_SQL.format(placeholders=placeholders), chunk
+                ):
+                    existing.add(row['file_path'])
+        except Exception as e:
+            print(f"[DB] Delete resume error: {e}")
+        
+        self.db.writer.queue_resume_delete(file_paths)
+        return len(existing)
     
     def cleanup_old(self, days=30):
-        """Clean up old resume points"""
+        """
+        Clean up old resume points and paths no table references any more
+        
+        The deletes are queued on the writer thread (behind pending writes,
+        which are never old), so callers on the GUI thread never commit.
+        
+        Returns:
+            Number of resume points that will be removed
+        """
         try:
-            with self.db.lock:
-                cutoff = time.time() - (days * 86400)
-                self.db.cursor.execute("DELETE FROM resume_points WHERE last_updated < ?", (cutoff,))
-                deleted = self.db.cursor.rowcount
-                self.db.conn.commit()
-                print(f"[DB] Cleaned {deleted} old resume points")
-                return deleted
+            cutoff = time.time() - (days * 86400)
+            rows = self.db.query(
+                "SELECT p.path AS file_path FROM resume_points r "
+                "JOIN paths p ON p.path_id = r.path_id WHERE r.last_updated < ?",
+                (cutoff,)
+            )
+            old = [row['file_path'] for row in rows]
+            pending = self.db.writer.pending_resume(old)
+            deleted = len([p for p in old if p not in pending])
+            
+            self.db.writer.queue_sql(
+                "DELETE FROM resume_points WHERE last_updated < ?", (cutoff,)
+            )
+            # Paths nothing points to any more (deleted favorites, history...)
+            self.db.writer.queue_call(self.db.paths.cleanup)
+            self.db.writer.request_flush()
+            print(f"[DB] Cleaned {deleted} old resume points")
+            return deleted
         except:
             return 0
     
     def get_all(self):
-        """Get all resume points"""
+        """Get all resume points (pending writes included)"""
         try:
-            with self.db.lock:
-                self.db.cursor.execute('''
-                    SELECT file_path, position_seconds, last_updated
-                    FROM resume_points
-                    ORDER BY last_updated DESC
-                ''')
-                return [dict(row) for row in self.db.cursor.fetchall()]
+            # Taken before reading so a flush in between loses nothing
+            pending = self.db.writer.pending_resume()
+            rows = self.db.query('''
+                SELECT p.path AS file_path, r.position_seconds, r.last_updated
+                FROM resume_points r JOIN paths p ON p.path_id = r.path_id
+            ''')
+            points = {row['file_path']: dict(row) for row in rows}
         except:
             return []
+        
+        for file_path, value in pending.items():
+            if value is None:
+                points.pop(file_path, None)
+            else:
+                points[file_path] = {
+                    'file_path': file_path,
+                    'position_seconds': value[0],
+                    'last_updated': value[3],
+                }
+        
+        return sorted(points.values(), key=lambda p: p['last_updated'] or 0, reverse=True)
@@ -0,0 +1,162 @@
+# ============================================================================
+# ModernMedia/database/writer.py v5.0 - Write-Behind Writer
+# ============================================================================
+
+import time
+import threading
+from .paths import INTERN_SQL, PATH_ID_SQL
+
+# Default durability window in seconds
+WRITE_BEHIND_INTERVAL = 15
+
+class WriteBehindWriter(threading.Thread):
+    """
+    Background writer on the database's single writer connection
+    
+    Resume updates are coalesced per file (only the latest position is
+    written) and watch events are queued as statements. Everything
+    pending goes out in a single transaction when the durability window
+    expires, on request_flush() (player exit) or on stop().
+    
+    Flushes run through DatabaseManager.transaction(), so they queue
+    on the write lock instead of contending for the SQLite file lock.
+    """
+    
+    def __init__(self, db, interval=WRITE_BEHIND_INTERVAL):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        
+        self.db = db
+        self.interval = interval
+        
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+        
+        self.resume = {}         # file_path -> (position, size, mtime, updated) or None = delete
+        self.statements = []     # (sql, params) in arrival order
+        self.inflight = {}       # resume writes of the running flush
+        
+        self.flushes = 0
+        self.coalesced = 0
+    
+    def set_interval(self, seconds):
+        """Change the durability window"""
+        self.interval = max(1, seconds)
+        self.wake.set()
+    
+    def queue_resume(self, file_path, position_seconds, file_size, mtime):
+        """Queue a resume position (replaces a pending one for the file)"""
+        with self.lock:
+            if file_path in self.resume:
+                self.coalesced += 1
+            self.resume[file_path] = (position_seconds, file_size, mtime, time.time())
+    
+    def queue_resume_delete(self, file_paths):
+        """Queue resume point deletions"""
+        with self.lock:
+            for file_path in file_paths:
+                self.resume[file_path] = None
+    
+    def queue_sql(self, sql, params=()):
+        """Queue a statement (watch events, statistics)"""
+        with self.lock:
+            self.statements.append((sql, params))
+    
+    def queue_call(self, func):
+        """Queue func(cursor) to run inside the next flush transaction"""
+        with self.lock:
+            self.statements.append((func, None))
+    
+    def pending_resume(self, file_paths=None):
+        """
+        Resume writes not flushed yet
+        
+        Args:
+            file_paths: Files to look up (default: all pending writes)
+        
+        Returns:
+            dict of file_path -> (position, size, mtime, updated), or None
+            for a pending delete; only files with pending writes
+        """
+        with self.lock:
+            if file_paths is None:
+                pending = dict(self.inflight)
+                pending.update(self.resume)
+                return pending
+            
+            pending = {}
+            for p in file_paths:
+                if p in self.resume:
+                    pending[p] = self.resume[p]
+                elif p in self.inflight:
+                    pending[p] = self.inflight[p]
+            return pending
+    
+    def request_flush(self):
+        """Flush soon on the writer thread"""
+        self.wake.set()
+    
+    def run(self):
+        """Flush every interval or when woken"""
+        while not self.stop_event.is_set():
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.flush()
+    
+    def flush(self):
+        """
+        Write everything pending in one transaction
+        
+        Returns:
+            True if nothing was left to write
+        """
+        with self.flush_lock:
+            with self.lock:
+                resume, self.resume = self.resume, {}
+                statements, self.statements = self.statements, []
+                self.inflight = resume
+            
+            if not resume and not statements:
+                return True
+            
+            try:
+                updates = [(p,) + v for p, v in resume.items() if v is not None]
+                with self.db.transaction() as cursor:
+                    cursor.executemany(INTERN_SQL, [u[:1] for u in updates])
+                    cursor.executemany(f'''
+                        INSERT OR REPLACE INTO resume_points
+                        (path_id, position_seconds, file_size, mtime, last_updated)
+                        VALUES ({PATH_ID_SQL}, ?, ?, ?, ?)
+                    ''', updates)
+                    cursor.executemany(
+                        f"DELETE FROM resume_points WHERE path_id = {PATH_ID_SQL}",
+                        [(p,) for p, v in resume.items() if v is None]
+                    )
+                    for sql, params in statements:
+                        if callable(sql):
+                            sql(cursor)
+                        else:
+                            cursor.execute(sql, params)
+                self.flushes += 1
+                with self.lock:
+                    self.inflight = {}
+                return True
+            
+            except Exception as e:
+                print(f"[DB] Write-behind flush error: {e}")
+                
+                # Keep the data for the next attempt, newer writes win
+                with self.lock:
+                    for file_path, value in resume.items():
+                        self.resume.setdefault(file_path, value)
+                    self.statements[:0] = statements
+                    self.inflight = {}
+                return False
+    
+    def stop(self):
+        """Stop the thread and flush pending writes"""
+        self.stop_event.set()
+        self.wake.set()
+        self.flush()
@@ -0,0 +1,20 @@
+# ============================================================================
+# ModernMedia/tests/conftest.py v5.0 - Test Setup
+# ============================================================================
+
+import os
+import sys
+import importlib.util
+
+# The plugin is installed as the ModernMedia package, register the
+# checkout under that name so relative imports resolve
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'ModernMedia' not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        'ModernMedia', os.path.join(ROOT, '__init__.py'),
+        submodule_search_locations=[ROOT]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['ModernMedia'] = module
+    spec.loader.exec_module(module)
@@ -0,0 +1,49 @@
+# ============================================================================
+# ModernMedia/tests/test_paths.py v5.0 - Path Interning Cleanup
+# ============================================================================
+
+import pytest
+
+from ModernMedia.database import connection
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """DatabaseManager on a throwaway file"""
+    monkeypatch.setattr(connection, 'get_db_path', lambda: str(tmp_path / "media.db"))
+    manager = connection.DatabaseManager()
+    yield manager
+    manager.close()
+
+def stored_paths(db):
+    """All paths currently interned"""
+    return {row['path'] for row in db.query("SELECT path FROM paths")}
+
+def test_cleanup_removes_unreferenced_paths(db):
+    db.favorites.add('/a.mkv')
+    db.favorites.add('/b.mkv')
+    db.resume.set('/c.mkv', 120, 1000, 1.0)
+    db.writer.flush()
+    assert stored_paths(db) == {'/a.mkv', '/b.mkv', '/c.mkv'}
+    assert db.paths.get_id('/a.mkv') is not None
+    
+    db.favorites.remove('/a.mkv')
+    with db.transaction() as cursor:
+        assert db.paths.cleanup(cursor) == 1
+    
+    assert stored_paths(db) == {'/b.mkv', '/c.mkv'}
+    assert db.paths.get_id('/a.mkv') is None
+    
+    # Re-interning after the sweep must not reuse a stale cached id
+    db.favorites.add('/a.mkv')
+    assert db.favorites.is_favorite('/a.mkv')
+
+def test_cleanup_old_sweeps_on_the_writer(db):
+    db.favorites.add('/a.mkv')
+    db.favorites.remove('/a.mkv')
+    db.resume.set('/b.mkv', 60, 1000, 1.0)
+    db.writer.flush()
+    
+    db.resume.cleanup_old()
+    db.writer.flush()
+    
+    assert stored_paths(db) == {'/b.mkv'}
@@ -0,0 +1,65 @@
+# ============================================================================
+# ModernMedia/tests/test_query_plans.py v5.0 - Hot Query Plans
+# ============================================================================
+
+import sqlite3
+import pytest
+
+from ModernMedia.database import queries
+from ModernMedia.database.migrations import run_migrations, SCHEMA_VERSION
+
+# Sample parameters for every *_SQL constant in database/queries.py
+SAMPLE_PARAMS = {
+    'PATH_ID_LOOKUP_SQL': ('/media/hdd/movie/a.mkv',),
+    'RESUME_GET_MANY_SQL': ('/a.mkv', '/b.mkv'),
+    'FAVORITE_CHECK_SQL': (1, 'default'),
+    'FAVORITES_FILTER_SQL': ('default', '/a.mkv', '/b.mkv'),
+    'FILE_HISTORY_SQL': (1, 'default'),
+    'MOST_WATCHED_SQL': ('default', 10),
+    'PLAYLIST_ITEMS_SQL': (1,),
+    'PLAYLIST_NEXT_POSITION_SQL': (1,),
+    'METADATA_PROBE_STATES_SQL': ('/a.mkv', '/b.mkv'),
+    'METADATA_DURATIONS_SQL': ('/a.mkv', '/b.mkv'),
+    'LIBRARY_FILES_SQL': ('/media/hdd/movie',),
+    'LIBRARY_ENTRIES_SQL': ('/a.mkv', '/b.mkv'),
+}
+
+HOT_QUERIES = sorted(name for name in dir(queries) if name.endswith('_SQL'))
+
+def query_plan(conn, sql, params):
+    """EXPLAIN QUERY PLAN detail lines (detail is the last column)"""
+    if '{placeholders}' in sql:
+        sql = sql.format(placeholders=",".join("?" * (len(params) - sql.count('?'))))
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [row[-1] for row in rows]
+
+def full_scans(plan):
+    """
+    SCAN lines over tables or indexes
+    
+    An ordered SCAN ... USING INDEX still visits every row. Subquery
+    results (MATERIALIZE x / CO-ROUTINE x) are already narrowed down.
+    """
+    derived = set(line.split()[1] for line in plan
+                  if line.startswith(('MATERIALIZE ', 'CO-ROUTINE ')))
+    return [line for line in plan
+            if line.startswith('SCAN') and line.split()[1] not in derived]
+
+@pytest.fixture(scope='module')
+def conn():
+    conn = sqlite3.connect(':memory:')
+    assert run_migrations(conn) == SCHEMA_VERSION
+    yield conn
+    conn.close()
+
+def test_every_hot_query_has_sample_params():
+    assert set(HOT_QUERIES) == set(SAMPLE_PARAMS)
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_query_uses_index(conn, name):
+    plan = query_plan(conn, getattr(queries, name), SAMPLE_PARAMS[name])
+    assert full_scans(plan) == [], f"{name}: {plan}"
+
+def test_full_scan_is_detected(conn):
+    plan = query_plan(conn, "SELECT * FROM watch_history WHERE duration_watched > ?", (1,))
+    assert full_scans(plan)
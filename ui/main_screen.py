@@ -3,7 +3,8 @@
 # ============================================================================
 
 import os
-import threading
+import heapq
+import queue
 from Screens.Screen import Screen
 from Components.ActionMap import ActionMap
 from Components.Label import Label
@@ -16,13 +17,42 @@ from Screens.VirtualKeyBoard import VirtualKeyBoard
 from enigma import eTimer, ePicLoad
 
 from ..config import get_config
-from ..constants import MEDIA_EXTENSIONS, ALTERNATIVE_PATHS, SORT_KEYS
-from ..utils import SmartCache, ThumbnailManager, DirectoryScanner, ProgressBarRenderer
+from ..constants import (
+    MEDIA_EXTENSIONS, ALTERNATIVE_PATHS, SORT_KEYS, POSTER_CACHE_MAX, POSTER_CACHE_MAX_BYTES
+)
+from ..utils import (
+    SmartCache, ThumbnailManager, ThumbnailScheduler, ThumbnailBatch, PRIORITY_CURRENT,
+    PRIORITY_VISIBLE, DirectoryScanner, DirectoryPrefetcher,
+    LibraryIndexer, get_library_roots, DirectoryWatcher, MediaProber, ProgressBarRenderer
+)
+from ..utils.cache import BoundedLRU
+from ..database.writer import WRITE_BEHIND_INTERVAL
 from ..utils.helpers import format_size, format_time, truncate_path, find_next_episode, find_subtitle
 from .skins import SkinGenerator
 from .menus import MenuHandler
 from .player import ModernMediaPlayer
 
+# Poll interval while a scan streams in results
+SCAN_POLL_MS = 100
+
+# Rows above/below the cursor treated as visible for thumbnail priority
+VISIBLE_ROWS = 6
+
+# Progress refresh interval for batch thumbnail generation
+THUMB_POLL_MS = 500
+
+# Poll interval for finished thumbnails while jobs are pending
+THUMB_READY_POLL_MS = 100
+
+# Poll interval for new probe results while the prober is busy
+PROBE_POLL_MS = 1000
+
+# Poster widget size (decode target)
+POSTER_SIZE = (280, 420)
+
+# Selection must rest this long before poster and info panel update
+POSTER_DEBOUNCE_MS = 150
+
 class ModernMediaScreen(Screen):
     """
     Main file browser screen
@@ -41,20 +71,55 @@ class ModernMediaScreen(Screen):
         self.current_path = self._get_start_dir()
         self.last_played_file = None
         self.scanner_thread = None
+        self.indexer = None
         self.search_query = ""
+        self.scan_dirs = []
+        self.scan_files = []
+        self.scan_durations = {}
+        self.shown_items = None     # list set by _show_items (not a menu view)
         
         # Components
-        self.cache = SmartCache()
-        self.thumb_mgr = ThumbnailManager()
+        self.cache = SmartCache(persistent=self._use_persistent_cache())
+        self.thumb_mgr = ThumbnailManager(
+            mode=self._get_thumb_mode(), content_keys=self._use_content_keys()
+        )
+        self.thumb_scheduler = ThumbnailScheduler(
+            self.thumb_mgr, self._get_thumb_workers(), duration_lookup=self._stored_duration
+        )
+        self.thumb_batch = ThumbnailBatch(self.thumb_scheduler)
+        # Finished thumbnails (callback, path, thumb) from the worker threads
+        self.thumb_results = queue.Queue()
         self.progress_renderer = ProgressBarRenderer()
         self.menu_handler = MenuHandler(self, db_instance)
+        self.prefetcher = DirectoryPrefetcher(self.cache, MEDIA_EXTENSIONS)
+        self.prefetcher.start()
+        self.watcher = DirectoryWatcher(
+            self.cache, db_instance if self.library_enabled() else None, MEDIA_EXTENSIONS
+        )
+        self.watcher.start()
+        self.prober = None
+        if db_instance:
+            self.prober = MediaProber(db_instance)
+            self.prober.start()
+            db_instance.writer.set_interval(self._get_flush_interval())
         
         # Timers
         self.scan_timer = eTimer()
         self.scan_timer.callback.append(self._check_scan_status)
+        self.thumb_timer = eTimer()
+        self.thumb_timer.callback.append(self._check_thumb_batch)
+        self.thumb_ready_timer = eTimer()
+        self.thumb_ready_timer.callback.append(self._drain_thumb_results)
+        self.probe_timer = eTimer()
+        self.probe_timer.callback.append(self._drain_probe_updates)
+        self.poster_timer = eTimer()
+        self.poster_timer.callback.append(self._update_poster)
         # REMOVED: long_press_timer - not needed anymore
         
-        # Poster loader
+        # Poster loader and decoded pixmaps by image path
+        self.poster_cache = BoundedLRU(POSTER_CACHE_MAX, POSTER_CACHE_MAX_BYTES)
+        self.poster_wanted = None
+        self.poster_decoding = None
         self.poster_loader = ePicLoad()
         try:
             self.poster_loader.PictureData.get().append(self._poster_loaded_callback)
@@ -130,11 +195,69 @@ class ModernMediaScreen(Screen):
                 return path
         return "/media/"
     
+    def _use_persistent_cache(self):
+        """Whether directory listings are kept on disk between sessions"""
+        try:
+            return get_config().cache_directory_listings.value
+        except:
+            return True
+    
+    def library_enabled(self):
+        """Whether the full-library index is used (scan_subdirs)"""
+        try:
+            return bool(self.db) and get_config().scan_subdirs.value
+        except:
+            return False
+    
+    def _get_thumb_mode(self):
+        """Configured FFmpeg extraction mode"""
+        try:
+            return get_config().thumb_mode.value
+        except:
+            return None
+    
+    def _use_content_keys(self):
+        """Whether thumbnails follow file content instead of the path"""
+        try:
+            return get_config().thumb_content_keys.value
+        except:
+            return False
+    
+    def _get_flush_interval(self):
+        """Configured durability window for resume writes (seconds)"""
+        try:
+            return int(get_config().resume_flush_interval.value)
+        except:
+            return WRITE_BEHIND_INTERVAL
+    
+    def _get_thumb_workers(self):
+        """Configured thumbnail parallelism (None = CPU count)"""
+        try:
+            value = get_config().thumb_workers.value
+            return None if value == "auto" else int(value)
+        except:
+            return None
+    
     def _startup(self):
         """Called when screen is ready"""
         self._update_title()
         self["status"].setText("Ready")
         self.refresh_list()
+        self.start_library_index()
+        
+        # Continue a thumbnail batch interrupted by the last exit
+        if self.thumb_batch.resume_pending():
+            self.thumb_timer.start(THUMB_POLL_MS, True)
+    
+    def start_library_index(self):
+        """Incrementally (re)index the whole library in the background"""
+        if not self.library_enabled():
+            return
+        if self.indexer and self.indexer.is_alive():
+            return
+        
+        self.indexer = LibraryIndexer(self.db, get_library_roots(self._get_start_dir()))
+        self.indexer.start()
     
     # === Display Updates ===
     
@@ -165,41 +288,129 @@ class ModernMediaScreen(Screen):
             self.scanner_thread.stop()
             self.scanner_thread.join(timeout=1.0)
         
+        self.prefetcher.pause()
+        if self.prober:
+            self.prober.pause()
+        self.scan_dirs = []
+        self.scan_files = []
+        self.scan_durations = {}
+        
         self.scanner_thread = DirectoryScanner(
             self.current_path, self.db, MEDIA_EXTENSIONS,
             self.search_query, self.cache
         )
         self.scanner_thread.start()
-        self.scan_timer.start(200, True)
+        self.scan_timer.start(SCAN_POLL_MS, True)
         
         self["status"].setText("⟳ Scanning...")
         self["list"].setList([("Scanning...", None, 'scan', None, None, 0)])
     
     def _check_scan_status(self):
-        """Check if scan completed"""
-        if self.scanner_thread and not self.scanner_thread.is_alive():
+        """Merge newly scanned chunks and check if scan completed"""
+        scanner = self.scanner_thread
+        if not scanner:
+            return
+        
+        # Read liveness before draining so no final chunk is missed
+        finished = not scanner.is_alive()
+        chunks = scanner.get_chunks()
+        
+        for chunk, durations in chunks:
+            self._merge_chunk(chunk, durations)
+        
+        if finished:
             self.scan_timer.stop()
+            self.prefetcher.resume()
+            if self.prober:
+                self.prober.resume()
             self._process_scan_results()
-        else:
-            self.scan_timer.start(200, True)
+            return
+        
+        if chunks:
+            self._show_items(final=False)
+        self.scan_timer.start(SCAN_POLL_MS, True)
+    
+    def _merge_chunk(self, chunk, durations):
+        """Merge a chunk of scan items (and their durations) into the sorted listing"""
+        # Search filter
+        if self.search_query:
+            query = self.search_query.lower()
+            chunk = [i for i in chunk if query in i[0].lower()]
+        
+        dir_key = lambda x: x[0].lower()
+        file_key, reverse = self._get_file_sort()
+        
+        self.scan_durations.update(durations)
+        
+        dirs = sorted((i for i in chunk if i[2] == 'dir'), key=dir_key)
+        files = sorted((i for i in chunk if i[2] == 'file'), key=file_key, reverse=reverse)
+        
+        if dirs:
+            self.scan_dirs = list(heapq.merge(self.scan_dirs, dirs, key=dir_key))
+        if files:
+            self.scan_files = list(heapq.merge(
+                self.scan_files, files, key=file_key, reverse=reverse
+            ))
     
     def _process_scan_results(self):
         """Process and display scan results"""
-        items = self.scanner_thread.results
-        
         if self.scanner_thread.exception:
             self["status"].setText(f"Error: {str(self.scanner_thread.exception)[:40]}")
             return
         
-        if not items:
-            items = []
+        self._show_items(final=True)
+        self.watcher.watch(self.current_path)
         
-        # Search filter
-        if self.search_query:
-            items = [i for i in items if self.search_query.lower() in i[0].lower()]
+        # Probe durations/codecs of new or changed files in the background
+        if self.prober:
+            self.prober.submit([
+                (i[1], i[3], i[4]) for i in self.scan_files if i[2] == 'file'
+            ])
+            if not self.probe_timer.isActive():
+                self.probe_timer.start(PROBE_POLL_MS)
+        self._update_poster()
+    
+    def _drain_probe_updates(self):
+        """Apply durations probed for the listing on screen"""
+        # Read before draining so no result written by a last batch is missed
+        idle = not self.prober.busy()
         
-        # Sort
-        items = self._sort_items(items)
+        durations = self.prober.get_updates()
+        if durations and self.scan_files:
+            listed = set(i[1] for i in self.scan_files)
+            durations = {p: d for p, d in durations.items() if p in listed}
+            if durations:
+                self.scan_durations.update(durations)
+                self._refresh_durations()
+        
+        if idle:
+            self.probe_timer.stop()
+    
+    def _refresh_durations(self):
+        """Re-sort by duration and redraw progress bars, keep the selection"""
+        # Favorites, recent or search results are on screen, or a new
+        # scan is streaming in (its chunks use scan_durations already)
+        if self["list"].list is not self.shown_items:
+            return
+        if self.scanner_thread and self.scanner_thread.is_alive():
+            return
+        
+        selected = self["list"].getCurrent()
+        
+        if self._sort_by_duration():
+            file_key, reverse = self._get_file_sort()
+            self.scan_files.sort(key=file_key, reverse=reverse)
+        self._show_items(final=True)
+        
+        if selected and selected[1]:
+            for index, item in enumerate(self["list"].list):
+                if item[1] == selected[1]:
+                    self["list"].moveToIndex(index)
+                    break
+    
+    def _show_items(self, final):
+        """Display the merged listing (partial while scanning)"""
+        items = self.scan_dirs + self.scan_files
         
         # Add parent directory
         if self.current_path != "/":
@@ -210,40 +421,53 @@ class ModernMediaScreen(Screen):
         items = self._add_progress_bars(items)
         
         # Check empty
-        if not items or (len(items) == 1 and items[0][2] == '..'):
+        if final and (not items or (len(items) == 1 and items[0][2] == '..')):
             items.append(("No media files", None, 'empty', None, None, 0))
         
+        # Keep the cursor where it is while chunks arrive
+        index = self["list"].getSelectionIndex()
         self["list"].setList(items)
+        self.shown_items = items
+        if index < len(items):
+            self["list"].moveToIndex(index)
+        
         self._update_counter(items)
-        self._update_status(items)
-        self._update_poster()
+        if final:
+            self._update_status(items)
+        else:
+            self["status"].setText(f"⟳ Scanning... {len(items)} items")
     
-    def _sort_items(self, items):
-        """Sort items by configured key"""
+    def _get_sort_key(self):
+        """Configured sort key"""
         try:
-            cfg = get_config()
-            sort_key = cfg.sort_key.value
+            return get_config().sort_key.value
         except:
-            sort_key = "name_asc"
-        
-        dirs = [i for i in items if i[2] == 'dir']
-        files = [i for i in items if i[2] == 'file']
+            return "name_asc"
+    
+    def _sort_by_duration(self):
+        """Whether files are sorted by probed duration"""
+        return 'duration' in self._get_sort_key()
+    
+    def _get_file_sort(self):
+        """Get (key function, reverse) for the configured file sort"""
+        sort_key = self._get_sort_key()
         
-        if 'name' in sort_key:
-            reverse = 'desc' in sort_key
-            files.sort(key=lambda x: x[0].lower(), reverse=reverse)
+        reverse = 'desc' in sort_key
+        if 'duration' in sort_key:
+            # Unprobed files count as 0
+            return (lambda x: self.scan_durations.get(x[1], 0)), reverse
         elif 'date' in sort_key:
-            reverse = 'desc' in sort_key
-            files.sort(key=lambda x: x[4] if x[4] else 0, reverse=reverse)
+            return (lambda x: x[4] if x[4] else 0), reverse
         elif 'size' in sort_key:
-            reverse = 'desc' in sort_key
-            files.sort(key=lambda x: x[3] if x[3] else 0, reverse=reverse)
-        
-        dirs.sort(key=lambda x: x[0].lower())
-        return dirs + files
+            return (lambda x: x[3] if x[3] else 0), reverse
+        return (lambda x: x[0].lower()), reverse
     
-    def _add_progress_bars(self, items):
-        """Add visual progress bars - RESTORED original working version"""
+    def _add_progress_bars(self, items, durations=None):
+        """
+        Add visual progress bars - RESTORED original working version
+        
+        durations: Probed durations by path (default: the current scan's)
+        """
         try:
             cfg = get_config()
             if not cfg.show_progress_bars.value:
@@ -251,14 +475,19 @@ class ModernMediaScreen(Screen):
         except:
             return items
         
+        if durations is None:
+            durations = self.scan_durations
+        
         enhanced = []
         for item in items:
             if item[2] == 'file' and item[5] > 0:
                 resume_sec = item[5]
                 size = item[3]
                 
-                # Estimate duration (1GB ≈ 1 hour for video)
-                est_dur = int((size / (1024**3)) * 3600) if size else 0
+                # Probed duration, else estimate (1GB ≈ 1 hour for video)
+                est_dur = durations.get(item[1])
+                if not est_dur:
+                    est_dur = int((size / (1024**3)) * 3600) if size else 0
                 
                 if est_dur > 0:
                     # Calculate percentage
@@ -314,46 +543,161 @@ class ModernMediaScreen(Screen):
     
     # === Poster Display ===
     
+    def _schedule_poster_update(self):
+        """Update poster once the selection settles (key repeat coalescing)"""
+        self.poster_timer.start(POSTER_DEBOUNCE_MS, True)
+    
     def _update_poster(self):
         """Update poster for selected item"""
+        self.poster_timer.stop()
+        self._prefetch_selection()
+        
         selected = self["list"].getCurrent()
         if not selected or selected[2] != 'file':
+            self.poster_wanted = None
             self["info"].setText("")
             return
         
         file_path = selected[1]
         
-        # Load thumbnail
-        if self.thumb_mgr.has_thumb(file_path):
-            thumb = self.thumb_mgr.get_thumb_path(file_path)
+        # Load thumbnail (keys not resolved yet are left to the workers)
+        thumb = None
+        if self.thumb_mgr.has_thumb(file_path, cached_only=True):
+            thumb = self.thumb_mgr.get_thumb_path(file_path, cached_only=True)
+        if thumb:
             self._load_poster_image(thumb)
         else:
-            # Generate async
-            def worker():
-                thumb = self.thumb_mgr.generate(file_path)
-                if thumb:
-                    self._load_poster_image(thumb)
-            threading.Thread(target=worker, daemon=True).start()
+            # Generate async - highlighted file first
+            self._submit_thumb(file_path, PRIORITY_CURRENT, self._thumb_ready)
+        
+        self._queue_visible_thumbs()
         
         # Update info
         self._update_info_panel(file_path, selected[3], selected[5])
     
+    def _queue_visible_thumbs(self):
+        """Queue thumbnails for rows around the cursor, drop scrolled-out jobs"""
+        items = self["list"].list
+        index = self["list"].getSelectionIndex()
+        
+        visible = [
+            i[1] for i in items[max(0, index - VISIBLE_ROWS):index + VISIBLE_ROWS + 1]
+            if i[2] == 'file'
+        ]
+        self.thumb_scheduler.set_visible(visible)
+        
+        for path in visible:
+            if not self.thumb_mgr.has_thumb(path, cached_only=True):
+                self.thumb_scheduler.submit(path, PRIORITY_VISIBLE)
+    
+    def _submit_thumb(self, file_path, priority, on_ready, pinned=False):
+        """
+        Queue a thumbnail job whose result is handled on the GUI thread
+        
+        on_ready(file_path, thumb) runs from thumb_ready_timer, the worker
+        thread only posts the result to thumb_results. thumb is None if
+        generation failed or the request was cancelled.
+        """
+        self.thumb_scheduler.submit(
+            file_path, priority,
+            lambda path, thumb: self.thumb_results.put((on_ready, path, thumb)),
+            pinned=pinned
+        )
+        if not self.thumb_ready_timer.isActive():
+            self.thumb_ready_timer.start(THUMB_READY_POLL_MS)
+    
+    def _stored_duration(self, file_path):
+        """Probed duration from the database (thumbnail worker threads)"""
+        if not self.db:
+            return None
+        return self.db.metadata.get_durations([file_path]).get(file_path)
+    
+    def _drain_thumb_results(self):
+        """Run finished thumbnail callbacks on the GUI thread"""
+        # Read before draining so no result posted by a last job is missed
+        idle = not self.thumb_scheduler.busy()
+        
+        while True:
+            try:
+                on_ready, path, thumb = self.thumb_results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                on_ready(path, thumb)
+            except Exception as e:
+                print(f"[ModernMedia] Thumbnail callback error: {e}")
+        
+        if idle:
+            self.thumb_ready_timer.stop()
+    
+    def _thumb_ready(self, file_path, thumb):
+        """Thumbnail finished - show the poster if still highlighted"""
+        selected = self["list"].getCurrent()
+        if thumb and selected and selected[1] == file_path:
+            self._load_poster_image(thumb)
+    
+    def _prefetch_selection(self):
+        """Warm the cache for the highlighted directory and its neighbours"""
+        items = self["list"].list
+        index = self["list"].getSelectionIndex()
+        
+        paths = []
+        for i in (index, index + 1, index - 1):
+            if 0 <= i < len(items) and items[i][2] == 'dir':
+                paths.append(items[i][1])
+        
+        if paths:
+            self.prefetcher.request(paths)
+    
     def _load_poster_image(self, image_path):
-        """Load image into poster widget"""
+        """Load image into poster widget (decoded pixmaps are reused)"""
+        self.poster_wanted = image_path
+        
+        ptr = self.poster_cache.get(image_path)
+        if ptr is not None:
+            self._show_poster(ptr)
+            return
+        
         try:
-            self.poster_loader.setPara((280, 420, 1, 1, False, 1, "#00000000"))
-            self.poster_loader.startDecode(image_path)
+            width, height = POSTER_SIZE
+            self.poster_loader.setPara((width, height, 1, 1, False, 1, "#00000000"))
+            # Non-zero while busy - the callback picks the wanted image up
+            if self.poster_loader.startDecode(image_path) == 0:
+                self.poster_decoding = image_path
         except:
             pass
     
     def _poster_loaded_callback(self, picInfo=None):
         """Callback when poster loaded"""
+        decoded, self.poster_decoding = self.poster_decoding, None
         try:
             ptr = self.poster_loader.getData()
-            if ptr:
-                self["poster"].instance.setPixmap(ptr)
+            if ptr and decoded:
+                self.poster_cache.set(decoded, ptr, self._pixmap_bytes(ptr))
+            if ptr and decoded == self.poster_wanted:
+                self._show_poster(ptr)
         except:
             pass
+        
+        # Cursor moved on while decoding
+        if self.poster_wanted and self.poster_wanted != decoded:
+            self._load_poster_image(self.poster_wanted)
+    
+    def _show_poster(self, ptr):
+        """Put a decoded pixmap on the poster widget"""
+        try:
+            self["poster"].instance.setPixmap(ptr)
+        except:
+            pass
+    
+    def _pixmap_bytes(self, ptr):
+        """Approximate memory of a decoded pixmap (32 bpp)"""
+        try:
+            size = ptr.size()
+            return size.width() * size.height() * 4
+        except:
+            width, height = POSTER_SIZE
+            return width * height * 4
     
     def _update_info_panel(self, file_path, size, resume_sec):
         """Update info sidebar"""
@@ -429,12 +773,12 @@ class ModernMediaScreen(Screen):
     def _up_pressed(self):
         """Up - move selection"""
         self["list"].up()
-        self._update_poster()
+        self._schedule_poster_update()
     
     def _down_pressed(self):
         """Down - move selection"""
         self["list"].down()
-        self._update_poster()
+        self._schedule_poster_update()
     
     def _cancel_pressed(self):
         """Cancel - go up or exit"""
@@ -487,7 +831,16 @@ class ModernMediaScreen(Screen):
         from ..constants import VERSION
         
         cache_stats = self.cache.get_stats()
+        
+        library = "off"
+        if self.library_enabled():
+            lib_stats = self.db.library.get_stats()
+            library = f"{lib_stats['total_files']} files in {lib_stats['total_dirs']} dirs"
         thumb_count = self.thumb_mgr.get_cache_count()
+        timings = ", ".join(
+            f"{mode} {avg:.0f}ms/{count}"
+            for mode, (count, avg) in self.thumb_mgr.get_timing_stats().items()
+        ) or "-"
         
         info = (
             f"Debug Info\n\n"
@@ -495,13 +848,23 @@ class ModernMediaScreen(Screen):
             f"Python: {sys.version.split()[0]}\n"
             f"Path: {self.current_path}\n"
             f"DB: {'OK' if self.db else 'None'}\n"
-            f"Cache: {cache_stats['total_entries']} entries\n"
-            f"Thumbs: {thumb_count}"
+            f"Library: {library}\n"
+            f"Cache: {cache_stats['total_entries']} entries "
+            f"({format_size(cache_stats['bytes'])})\n"
+            f"Cache hits/misses: {cache_stats['hits'] + cache_stats['store_hits']}"
+            f"/{cache_stats['misses']} | Evicted: {cache_stats['evictions']}\n"
+            f"Thumbs: {thumb_count} ({timings})"
         )
         self._show_message(info, "info", 8)
     
     def _generate_thumbnails(self):
-        """Key 0 - batch generate thumbnails"""
+        """Key 0 - batch generate thumbnails (press again to cancel)"""
+        if self.thumb_batch.get_progress()[3]:
+            self.thumb_batch.cancel()
+            self.thumb_timer.stop()
+            self["status"].setText("Thumbnail generation cancelled")
+            return
+        
         items = self["list"].list
         videos = [i[1] for i in items if i[2] == 'file']
         
@@ -509,15 +872,23 @@ class ModernMediaScreen(Screen):
             self._show_message("No videos", "info", 2)
             return
         
-        self["status"].setText(f"Generating {len(videos)} thumbnails...")
-        
-        def worker():
-            for idx, video in enumerate(videos):
-                self.thumb_mgr.generate(video)
-                self["status"].setText(f"Generated {idx+1}/{len(videos)}")
+        if not self.thumb_batch.start(videos):
             self["status"].setText("Thumbnails ready!")
+            return
         
-        threading.Thread(target=worker, daemon=True).start()
+        self._check_thumb_batch()
+    
+    def _check_thumb_batch(self):
+        """Show batch progress on the status label"""
+        done, total, generated, running = self.thumb_batch.get_progress()
+        
+        if running:
+            self["status"].setText(
+                f"Thumbnails {done}/{total} ({self.thumb_scheduler.workers} parallel) - 0 to cancel"
+            )
+            self.thumb_timer.start(THUMB_POLL_MS, True)
+        else:
+            self["status"].setText(f"Thumbnails ready! ({generated} new)")
     
     # === Playback ===
     
@@ -645,5 +1016,21 @@ class ModernMediaScreen(Screen):
                 self.scanner_thread.join(timeout=1.0)
         
         self.scan_timer.stop()
+        self.thumb_timer.stop()
+        self.thumb_ready_timer.stop()
+        self.probe_timer.stop()
+        self.poster_timer.stop()
         # REMOVED: long_press_timer.stop() - timer no longer exists
+        self.prefetcher.stop()
+        self.watcher.stop()
+        self.thumb_scheduler.stop()
+        self.thumb_mgr.close()
+        self.poster_cache.clear()
+        if self.indexer:
+            self.indexer.stop()
+        if self.prober:
+            self.prober.stop()
+        if self.db:
+            self.db.writer.flush()
+        self.cache.close()
         Screen.close(self)
@@ -66,7 +66,7 @@ class MenuHandler:
         
         action = result[1]
         if action == "refresh":
-            self.screen.cache.clear()
+            self.screen.cache.invalidate_dir(self.screen.current_path)
             self.screen.refresh_list()
         elif action == "search":
             self.open_search()
@@ -141,12 +141,15 @@ class MenuHandler:
         elif action == "info":
             self.show_file_info((file_path, None, 'file', size, mtime, resume_sec))
         elif action == "thumb":
-            import threading
-            def worker():
-                self.screen["status"].setText("Generating...")
-                self.screen.thumb_mgr.generate(file_path)
-                self.screen["status"].setText("Thumbnail ready!")
-            threading.Thread(target=worker, daemon=True).start()
+            from ..utils import PRIORITY_CURRENT
+            self.screen["status"].setText("Generating...")
+            self.screen._submit_thumb(
+                file_path, PRIORITY_CURRENT,
+                lambda path, thumb: self.screen["status"].setText(
+                    "Thumbnail ready!" if thumb else "Thumbnail failed"
+                ),
+                pinned=True
+            )
     
     def show_dir_menu(self, item):
         """Show directory context menu"""
@@ -177,7 +180,7 @@ class MenuHandler:
         elif result[1] == "bookmark":
             self._add_bookmark(dir_path)
         elif result[1] == "scan":
-            self.screen.cache.clear()
+            self.screen.cache.invalidate_dir(dir_path)
             self.screen.refresh_list()
         elif result[1] == "thumbs":
             self.screen.current_path = dir_path
@@ -196,9 +199,12 @@ class MenuHandler:
             self.screen._show_message("No favorites\n\nPress RED to add!", "info", 3)
             return
         
+        # Indexed files are known to exist, only the rest is stat'ed
+        indexed = self.db.library.get_entries([f['file_path'] for f in favs])
+        
         items = []
         for fav in favs:
-            if os.path.exists(fav['file_path']):
+            if fav['file_path'] in indexed or os.path.exists(fav['file_path']):
                 items.append((
                     f"★ {os.path.basename(fav['file_path'])}", 
                     fav['file_path'], 
@@ -222,9 +228,12 @@ class MenuHandler:
             self.screen._show_message("No recent files", "info", 2)
             return
         
+        # Indexed files are known to exist, only the rest is stat'ed
+        indexed = self.db.library.get_entries([r['file_path'] for r in recent])
+        
         items = []
         for rec in recent:
-            if os.path.exists(rec['file_path']):
+            if rec['file_path'] in indexed or os.path.exists(rec['file_path']):
                 played = time.strftime('%m/%d %H:%M', time.localtime(rec['played_date']))
                 items.append((
                     f"{os.path.basename(rec['file_path'])} ({played})",
@@ -389,7 +398,56 @@ class MenuHandler:
     def _search_cb(self, query):
         """Search callback"""
         self.screen.search_query = query if query else ""
-        self.screen.refresh_list()
+        if query and self.screen.library_enabled():
+            self.show_library_search(query)
+        else:
+            self.screen.refresh_list()
+    
+    def show_library_search(self, query):
+        """Search the whole library index instead of the current folder"""
+        results = self.db.library.search(query)
+        if not results:
+            self.screen._show_message(f"No matches for: {query}", "info", 2)
+            return
+        
+        # get_many() deletes points that do not match the given size/mtime,
+        # so validate against the files as they are now, not the index
+        files = {}
+        for rec in results:
+            try:
+                st = os.stat(rec['file_path'])
+            except OSError:
+                continue
+            files[rec['file_path']] = (st.st_size, st.st_mtime)
+        
+        resume = self.db.resume.get_many(files)
+        favorites = self.db.favorites.filter_favorites(list(files))
+        
+        items = []
+        for rec in results:
+            file_path = rec['file_path']
+            if file_path not in files:
+                continue
+            resume_data = resume.get(file_path)
+            display = rec['name']
+            if file_path in favorites:
+                display = "★ " + display
+            size, mtime = files[file_path]
+            items.append((
+                display,
+                file_path,
+                'file',
+                size,
+                mtime,
+                resume_data['position_seconds'] if resume_data else 0
+            ))
+        
+        items = self.screen._add_progress_bars(
+            items, self.db.metadata.get_durations(list(files))
+        )
+        self.screen["list"].setList(items)
+        self.screen["status"].setText(f"Library search: {query} - {len(items)}")
+        self.screen["counter"].setText("")
     
     def open_settings(self):
         """Open settings screen"""
@@ -100,6 +100,7 @@ class ModernMediaPlayer(MoviePlayer):
         print("[Player] Leaving - saving position")
         self.save_timer.stop()
         self._save_resume_position()
+        self._flush_writes()
         self.close()
     
     def leavePlayerOnExit(self):
@@ -107,6 +108,7 @@ class ModernMediaPlayer(MoviePlayer):
         print("[Player] Exit event")
         self.save_timer.stop()
         self._save_resume_position()
+        self._flush_writes()
         self.close()
     
     def doEofInternal(self, playing):
@@ -114,8 +116,14 @@ class ModernMediaPlayer(MoviePlayer):
         print("[Player] End of file")
         self.save_timer.stop()
         self._save_resume_position(is_eof=True)
+        self._flush_writes()
         self.close()
     
+    def _flush_writes(self):
+        """Write the queued position and watch events out now"""
+        if self.db:
+            self.db.writer.request_flush()
+    
     def _save_resume_position(self, is_eof=False, periodic=False):
         """
         Save current position to database
@@ -4,8 +4,16 @@
 
 from .helpers import setup_logging, log_message, detect_environment, format_size, format_time
 from .cache import SmartCache
-from .thumbnails import ThumbnailManager
-from .scanner import DirectoryScanner
+from .thumbnails import (
+    ThumbnailManager, ThumbnailScheduler, ThumbnailBatch,
+    PRIORITY_CURRENT, PRIORITY_VISIBLE, PRIORITY_BATCH,
+    THUMB_MODE_FAST, THUMB_MODE_ACCURATE
+)
+from .thumbstore import ThumbnailStore
+from .scanner import DirectoryScanner, DirectoryPrefetcher, scan_directory, iter_directory, stat_entry
+from .indexer import LibraryIndexer, get_library_roots
+from .inotify import DirectoryWatcher
+from .probe import MediaProber
 from .progress import ProgressBarRenderer
 
 __all__ = [
@@ -16,6 +24,22 @@ __all__ = [
     'format_time',
     'SmartCache',
     'ThumbnailManager',
+    'ThumbnailScheduler',
+    'ThumbnailBatch',
+    'PRIORITY_CURRENT',
+    'PRIORITY_VISIBLE',
+    'PRIORITY_BATCH',
+    'THUMB_MODE_FAST',
+    'THUMB_MODE_ACCURATE',
+    'ThumbnailStore',
     'DirectoryScanner',
+    'DirectoryPrefetcher',
+    'scan_directory',
+    'iter_directory',
+    'stat_entry',
+    'LibraryIndexer',
+    'get_library_roots',
+    'DirectoryWatcher',
+    'MediaProber',
     'ProgressBarRenderer',
 ]
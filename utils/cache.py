@@ -2,78 +2,421 @@
 # ModernMedia/utils/cache.py v5.0 - Smart Caching System
 # ============================================================================
 
+import os
+import sys
+import json
 import time
+import sqlite3
 import threading
-from ..constants import CACHE_TTL
+from collections import OrderedDict
+from ..constants import (
+    CACHE_TTL, CACHE_DIR, CACHE_MAX_DIRS, CACHE_MAX_DIR_BYTES,
+    CACHE_MAX_META, CACHE_MAX_META_BYTES
+)
+
+def estimate_size(obj):
+    """
+    Approximate memory footprint of cached data in bytes
+    
+    Walks tuples, lists and dicts; cheap enough to run on every insert.
+    """
+    if obj is None or isinstance(obj, bool):
+        return 0
+    if isinstance(obj, str):
+        return 50 + len(obj)
+    if isinstance(obj, (int, float)):
+        return 28
+    if isinstance(obj, (tuple, list)):
+        return 56 + 8 * len(obj) + sum(estimate_size(i) for i in obj)
+    if isinstance(obj, dict):
+        return 232 + sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    return sys.getsizeof(obj)
+
+class BoundedLRU:
+    """
+    LRU map bounded by entry count and approximate bytes
+    Not thread-safe on its own - SmartCache holds its lock around it
+    """
+    
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+    
+    def __contains__(self, key):
+        return key in self.entries
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def get(self, key):
+        """Get value and mark it most recently used"""
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key][0]
+    
+    def set(self, key, value, size):
+        """Insert value, evicting least recently used entries as needed"""
+        self.pop(key)
+        
+        # Never let a single oversized entry flush the whole cache
+        if size > self.max_bytes:
+            return
+        
+        self.entries[key] = (value, size)
+        self.bytes += size
+        
+        while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, old_size) = self.entries.popitem(last=False)
+            self.bytes -= old_size
+            self.evictions += 1
+    
+    def pop(self, key):
+        """Remove key, returns value or None"""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        self.bytes -= entry[1]
+        return entry[0]
+    
+    def items(self):
+        """Snapshot of (key, value) pairs, oldest first"""
+        return [(k, v[0]) for k, v in self.entries.items()]
+    
+    def clear(self):
+        """Remove all entries"""
+        self.entries.clear()
+        self.bytes = 0
+
+def dir_signature(path):
+    """
+    Get (mtime, ctime) of a directory
+    
+    Creating, deleting or renaming an entry changes both, so an equal
+    signature means the listing is unchanged. Returns None on error.
+    """
+    try:
+        st = os.stat(path)
+        return (st.st_mtime, st.st_ctime)
+    except OSError:
+        return None
+
+class PersistentDirCache:
+    """
+    On-disk directory listing cache
+    Survives plugin restarts; entries are keyed by directory path and
+    validated against the directory's own mtime/ctime
+    """
+    
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.conn = None
+        self.lock = threading.RLock()
+        self.setup_cache()
+    
+    def setup_cache(self):
+        """Open cache database"""
+        for cache_dir in (self.cache_dir, "/tmp/.modernmedia_cache"):
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                self.conn = sqlite3.connect(
+                    os.path.join(cache_dir, "dircache.db"), check_same_thread=False
+                )
+                self.conn.execute("PRAGMA journal_mode = WAL")
+                self.conn.execute("PRAGMA synchronous = OFF")
+                self.conn.execute('''
+                    CREATE TABLE IF NOT EXISTS dir_listings (
+                        dir_path TEXT PRIMARY KEY,
+                        dir_mtime REAL,
+                        dir_ctime REAL,
+                        cached_at REAL,
+                        entries TEXT
+                    )
+                ''')
+                self.conn.commit()
+                self.cache_dir = cache_dir
+                print(f"[Cache] Persistent: {cache_dir}")
+                return
+            except Exception as e:
+                print(f"[Cache] Persistent cache error: {e}")
+                self.conn = None
+    
+    def get(self, path, ttl=CACHE_TTL):
+        """
+        Get stored listing if it is still valid
+        
+        One stat of the directory decides; the TTL only applies when the
+        directory cannot be stat'ed (e.g. a sleeping network mount).
+        """
+        if not self.conn:
+            return None
+        
+        try:
+            with self.lock:
+                row = self.conn.execute(
+                    "SELECT dir_mtime, dir_ctime, cached_at, entries "
+                    "FROM dir_listings WHERE dir_path = ?",
+                    (path,)
+                ).fetchone()
+        except Exception as e:
+            print(f"[Cache] Read error: {e}")
+            return None
+        
+        if not row:
+            return None
+        
+        dir_mtime, dir_ctime, cached_at, entries = row
+        signature = dir_signature(path)
+        
+        if signature is None:
+            if time.time() - cached_at >= ttl:
+                return None
+        elif signature != (dir_mtime, dir_ctime):
+            self.delete(path)
+            return None
+        
+        return [tuple(e) for e in json.loads(entries)], signature
+    
+    def set(self, path, data, signature):
+        """Store listing with the directory signature taken before listing"""
+        if not self.conn or signature is None:
+            return
+        
+        try:
+            with self.lock:
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO dir_listings
+                    (dir_path, dir_mtime, dir_ctime, cached_at, entries)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (path, signature[0], signature[1], time.time(),
+                      json.dumps(data, separators=(',', ':'))))
+                self.conn.commit()
+        except Exception as e:
+            print(f"[Cache] Write error: {e}")
+    
+    def delete(self, path):
+        """Remove stored listing"""
+        if not self.conn:
+            return
+        
+        try:
+            with self.lock:
+                self.conn.execute("DELETE FROM dir_listings WHERE dir_path = ?", (path,))
+                self.conn.commit()
+        except:
+            pass
+    
+    def clear(self):
+        """Remove all stored listings"""
+        if not self.conn:
+            return
+        
+        try:
+            with self.lock:
+                self.conn.execute("DELETE FROM dir_listings")
+                self.conn.commit()
+        except:
+            pass
+    
+    def count(self):
+        """Number of stored listings"""
+        if not self.conn:
+            return 0
+        
+        try:
+            with self.lock:
+                return self.conn.execute("SELECT COUNT(*) FROM dir_listings").fetchone()[0]
+        except:
+            return 0
+    
+    def close(self):
+        """Close cache database"""
+        try:
+            if self.conn:
+                self.conn.close()
+                self.conn = None
+        except:
+            pass
 
 class SmartCache:
     """
     Intelligent caching system for directory listings
-    Thread-safe with TTL expiration
+    Thread-safe with TTL expiration, backed by an optional on-disk tier.
+    Both memory tiers are LRU-bounded by entry count and approximate bytes.
     """
     
-    def __init__(self, ttl=CACHE_TTL):
-        self.dir_cache = {}
-        self.meta_cache = {}
+    def __init__(self, ttl=CACHE_TTL, persistent=True, cache_dir=CACHE_DIR,
+                 max_dirs=CACHE_MAX_DIRS, max_dir_bytes=CACHE_MAX_DIR_BYTES,
+                 max_meta=CACHE_MAX_META, max_meta_bytes=CACHE_MAX_META_BYTES):
+        self.dir_cache = BoundedLRU(max_dirs, max_dir_bytes)
+        self.meta_cache = BoundedLRU(max_meta, max_meta_bytes)
         self.ttl = ttl
         self.lock = threading.RLock()
+        self.store = PersistentDirCache(cache_dir) if persistent else None
+        
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
     
-    def get_dir(self, path):
-        """Get cached directory listing"""
+    def get_dir(self, path, record_stats=True):
+        """
+        Get cached directory listing
+        
+        Entries are revalidated with one stat of the directory; a changed
+        mtime/ctime drops just this directory. The TTL only applies when
+        the directory cannot be stat'ed.
+        
+        record_stats=False leaves hit/miss counters alone (speculative
+        lookups such as prefetch probes).
+        """
         with self.lock:
-            if path in self.dir_cache:
-                entry = self.dir_cache[path]
-                if time.time() - entry['time'] < self.ttl:
-                    return entry['data']
-                else:
-                    # Expired - remove
-                    del self.dir_cache[path]
+            entry = self.dir_cache.get(path)
+        
+        if entry:
+            signature = dir_signature(path)
+            if signature is not None and entry['signature'] is not None:
+                fresh = signature == entry['signature']
+            else:
+                fresh = time.time() - entry['time'] < self.ttl
+            
+            if fresh:
+                if record_stats:
+                    with self.lock:
+                        self.hits += 1
+                return entry['data']
+            
+            # Changed or expired - remove from both tiers
+            self.invalidate_dir(path)
+        
+        # Fall back to the on-disk tier (one stat of the directory)
+        elif self.store:
+            stored = self.store.get(path, self.ttl)
+            if stored:
+                data, signature = stored
+                with self.lock:
+                    if record_stats:
+                        self.store_hits += 1
+                    self._put(self.dir_cache, path, data, signature)
+                return data
+        
+        if record_stats:
+            with self.lock:
+                self.misses += 1
         return None
     
-    def set_dir(self, path, data):
-        """Cache directory listing"""
+    def _put(self, tier, key, data, signature=None):
+        """Insert into a memory tier with size accounting"""
+        tier.set(key, {
+            'data': data,
+            'time': time.time(),
+            'signature': signature
+        }, estimate_size(data))
+    
+    def set_dir(self, path, data, signature=None):
+        """
+        Cache directory listing
+        
+        Args:
+            path: Directory path
+            data: Listing to cache (JSON-serializable tuples)
+            signature: dir_signature() taken before listing; fetched
+                       now if not given
+        """
+        if signature is None:
+            signature = dir_signature(path)
+        
         with self.lock:
-            self.dir_cache[path] = {
-                'data': data,
-                'time': time.time()
-            }
+            self._put(self.dir_cache, path, data, signature)
+        
+        if self.store:
+            self.store.set(path, data, signature)
+    
+    def patch_dir(self, path, name, entry=None, before=None, after=None):
+        """
+        Update one entry of a cached listing in place
+        
+        The listing is only re-signed if its signature still matches the
+        directory right before this event; otherwise some change was never
+        applied and the directory is invalidated instead.
+        
+        Args:
+            path: Directory path
+            name: Entry name that changed
+            entry: New scan_directory() tuple, or None if it was removed
+            before: dir_signature() the directory had before this event
+            after: dir_signature() with the event applied; fetched now
+                   if not given
+        
+        Returns:
+            True if a cached listing was patched
+        """
+        if after is None:
+            after = dir_signature(path)
+        
+        with self.lock:
+            cached = self.dir_cache.get(path)
+            if not cached:
+                return False
+            
+            stale = before is None or cached['signature'] != before
+            if stale:
+                self.dir_cache.pop(path)
+            else:
+                data = [e for e in cached['data'] if e[0] != name]
+                if entry is not None:
+                    data.append(entry)
+                    data.sort(key=lambda e: e[0])
+                self._put(self.dir_cache, path, data, after)
+        
+        if stale:
+            if self.store:
+                self.store.delete(path)
+            return False
+        
+        if self.store:
+            self.store.set(path, data, after)
+        return True
     
     def get_meta(self, key):
         """Get cached metadata"""
         with self.lock:
-            if key in self.meta_cache:
-                entry = self.meta_cache[key]
+            entry = self.meta_cache.get(key)
+            if entry:
                 if time.time() - entry['time'] < self.ttl:
+                    self.hits += 1
                     return entry['data']
                 else:
-                    del self.meta_cache[key]
+                    self.meta_cache.pop(key)
+            self.misses += 1
         return None
     
     def set_meta(self, key, data):
         """Cache metadata"""
         with self.lock:
-            self.meta_cache[key] = {
-                'data': data,
-                'time': time.time()
-            }
+            self._put(self.meta_cache, key, data)
     
     def invalidate_dir(self, path):
         """Invalidate specific directory cache"""
         with self.lock:
-            if path in self.dir_cache:
-                del self.dir_cache[path]
+            self.dir_cache.pop(path)
+        if self.store:
+            self.store.delete(path)
     
     def invalidate_meta(self, key):
         """Invalidate specific metadata"""
         with self.lock:
-            if key in self.meta_cache:
-                del self.meta_cache[key]
+            self.meta_cache.pop(key)
     
     def clear(self):
         """Clear all caches"""
         with self.lock:
             self.dir_cache.clear()
             self.meta_cache.clear()
+        if self.store:
+            self.store.clear()
     
     def cleanup_expired(self):
         """Remove expired entries"""
@@ -85,7 +428,7 @@ class SmartCache:
                 if now - v['time'] >= self.ttl
             ]
             for k in expired_dirs:
-                del self.dir_cache[k]
+                self.dir_cache.pop(k)
             
             # Clean meta cache
             expired_meta = [
@@ -93,7 +436,7 @@ class SmartCache:
                 if now - v['time'] >= self.ttl
             ]
             for k in expired_meta:
-                del self.meta_cache[k]
+                self.meta_cache.pop(k)
             
             return len(expired_dirs) + len(expired_meta)
     
@@ -103,5 +446,16 @@ class SmartCache:
             return {
                 'dir_entries': len(self.dir_cache),
                 'meta_entries': len(self.meta_cache),
-                'total_entries': len(self.dir_cache) + len(self.meta_cache)
+                'total_entries': len(self.dir_cache) + len(self.meta_cache),
+                'stored_dirs': self.store.count() if self.store else 0,
+                'hits': self.hits,
+                'store_hits': self.store_hits,
+                'misses': self.misses,
+                'evictions': self.dir_cache.evictions + self.meta_cache.evictions,
+                'bytes': self.dir_cache.bytes + self.meta_cache.bytes
             }
+    
+    def close(self):
+        """Release the on-disk tier"""
+        if self.store:
+            self.store.close()
@@ -0,0 +1,226 @@
+# ============================================================================
+# ModernMedia/utils/indexer.py v5.0 - Media Library Indexer
+# ============================================================================
+
+import os
+import errno
+import time
+import queue
+import threading
+from ..constants import MEDIA_EXTENSIONS, ALTERNATIVE_PATHS
+from .scanner import scan_directory
+
+def get_library_roots(start_dir=None):
+    """
+    Get top-level directories to index
+    
+    Combines the configured start directory with the detected media
+    paths, skips "/" and drops roots nested inside another root.
+    """
+    candidates = []
+    for path in ([start_dir] if start_dir else []) + list(ALTERNATIVE_PATHS):
+        path = os.path.normpath(path)
+        if path != "/" and os.path.isdir(path) and path not in candidates:
+            candidates.append(path)
+    
+    roots = []
+    for path in sorted(candidates):
+        if not any(path.startswith(root + "/") for root in roots):
+            roots.append(path)
+    return roots
+
+def get_mount_points():
+    """Mount points from /proc/mounts, longest first ("/" if unreadable)"""
+    mounts = set(["/"])
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2:
+                    mounts.add(parts[1].replace('\\040', ' '))
+    except:
+        pass
+    return sorted(mounts, key=len, reverse=True)
+
+class LibraryIndexer(threading.Thread):
+    """
+    Threaded full-library indexer
+    Walks the library roots into media_dirs/media_files
+    
+    Every mounted device gets its own small worker pool, so separate
+    mounts (internal HDD, USB, NFS) are indexed concurrently while one
+    spindle is never hit by more than workers_per_device threads.
+    Directories are routed by the mount holding their path (no stat),
+    and even the stat of a directory runs on its own device's pool, so
+    a hanging NFS mount point never blocks the disk above it.
+    
+    Rescans are incremental: a directory whose mtime matches the index
+    is not listed again, only its known subdirectories are visited.
+    Note that a file growing in place does not change the directory
+    mtime, so its size is refreshed with the next change of the folder.
+    """
+    
+    def __init__(self, db, roots, media_ext=MEDIA_EXTENSIONS, workers_per_device=1):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        
+        self.db = db
+        self.roots = roots
+        self.media_ext = media_ext
+        self.workers_per_device = max(1, workers_per_device)
+        
+        self.stop_event = threading.Event()
+        self.condition = threading.Condition()
+        self.queues = {}         # mount point -> task queue
+        self.mounts = []
+        self.workers = []
+        self.pending = 0
+        self.visited = set()
+        
+        self.scanned = 0
+        self.skipped = 0
+        self.duration = 0
+    
+    def run(self):
+        """Index all roots and wait for every device pool to drain"""
+        started = time.time()
+        self.mounts = get_mount_points()
+        
+        for root in self.roots:
+            self._submit(root, None)
+        
+        with self.condition:
+            while self.pending and not self.stop_event.is_set():
+                self.condition.wait(0.5)
+            queues = list(self.queues.values())
+        
+        # Shut the pools down
+        for q in queues:
+            for _ in range(self.workers_per_device):
+                q.put(None)
+        for worker in self.workers:
+            worker.join(timeout=1.0)
+        
+        self.duration = time.time() - started
+        print(f"[Indexer] Done: {self.scanned} listed, {self.skipped} unchanged "
+              f"on {len(queues)} devices in {self.duration:.1f}s")
+    
+    def _mount_of(self, path):
+        """Mount point holding path (string match, no filesystem access)"""
+        for mount in self.mounts:
+            if path == mount or path.startswith(mount.rstrip('/') + '/'):
+                return mount
+        return "/"
+    
+    def _submit(self, path, parent_id):
+        """Queue a directory on the pool of the device it lives on"""
+        mount = self._mount_of(path)
+        
+        with self.condition:
+            # Checked under the lock so stop() never races a new pool
+            if self.stop_event.is_set():
+                return
+            q = self.queues.get(mount)
+            if q is None:
+                q = self._start_pool(mount)
+            self.pending += 1
+        
+        q.put((path, parent_id))
+    
+    def _stat(self, path):
+        """
+        Stat a queued directory on its own pool
+        
+        Returns:
+            stat result, or None if gone, unreadable or already visited
+        """
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            # Transient errors (NFS timeouts, EIO) keep the indexed subtree
+            if e.errno == errno.ENOENT:
+                self.db.library.remove_dir(path)
+            else:
+                print(f"[Indexer] Cannot stat {path}: {e}")
+            return None
+        
+        with self.condition:
+            # Symlink loops and roots reachable twice
+            key = (st.st_dev, st.st_ino)
+            if key in self.visited:
+                return None
+            self.visited.add(key)
+        return st
+    
+    def _start_pool(self, mount):
+        """Start the worker pool of one mounted device (caller holds the lock)"""
+        q = queue.Queue()
+        self.queues[mount] = q
+        
+        for n in range(self.workers_per_device):
+            worker = threading.Thread(
+                target=self._worker, args=(q,),
+                name=f"Indexer-{mount}-{n}"
+            )
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+        return q
+    
+    def _worker(self, q):
+        """Index directories of one device"""
+        while True:
+            task = q.get()
+            if task is None:
+                return
+            
+            try:
+                path, parent_id = task
+                st = None if self.stop_event.is_set() else self._stat(path)
+                if st is not None:
+                    result = self._index_dir(path, parent_id, st)
+                    if result:
+                        dir_id, children = result
+                        for child in children:
+                            self._submit(child, dir_id)
+            except Exception as e:
+                print(f"[Indexer] Error in {task[0]}: {e}")
+            finally:
+                with self.condition:
+                    self.pending -= 1
+                    self.condition.notify_all()
+    
+    def _index_dir(self, path, parent_id, st):
+        """
+        Index one directory
+        
+        Returns:
+            (dir_id, child dir paths) or None if unreadable/stopped
+        """
+        known = self.db.library.get_dir(path)
+        if known and known['mtime'] == st.st_mtime:
+            with self.condition:
+                self.skipped += 1
+            return known['dir_id'], self.db.library.get_child_dirs(known['dir_id'])
+        
+        try:
+            entries = scan_directory(path, self.media_ext, self.stop_event)
+        except OSError:
+            return None
+        
+        if self.stop_event.is_set():
+            return None
+        
+        dir_id = self.db.library.update_dir(path, parent_id, st.st_mtime, entries)
+        if dir_id is None:
+            return None
+        
+        with self.condition:
+            self.scanned += 1
+        return dir_id, [e[1] for e in entries if e[2] == 'dir']
+    
+    def stop(self):
+        """Stop indexing"""
+        with self.condition:
+            self.stop_event.set()
+            self.condition.notify_all()
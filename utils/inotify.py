@@ -0,0 +1,325 @@
+# ============================================================================
+# ModernMedia/utils/inotify.py v5.0 - Live Directory Watcher
+# ============================================================================
+
+import os
+import errno
+import struct
+import select
+import threading
+from collections import OrderedDict
+from ..constants import MEDIA_EXTENSIONS
+from .cache import dir_signature
+from .scanner import stat_entry
+
+# inotify event masks (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_UNMOUNT = 0x00002000
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+    IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+
+# Entry added or rewritten / entry gone / watched directory gone
+ENTRY_CHANGED = IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE
+ENTRY_REMOVED = IN_DELETE | IN_MOVED_FROM
+DIR_GONE = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED | IN_UNMOUNT
+
+# Only these may drop the directory from the library index; IN_IGNORED
+# and IN_UNMOUNT also fire when a disk is unmounted or pulled
+DIR_REMOVED = IN_DELETE_SELF | IN_MOVE_SELF
+
+# Filesystems where inotify misses remote changes - mtime polling instead
+NO_INOTIFY_FS = ('nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'davfs', 'ncpfs', '9p', 'fuse')
+
+# Maximum number of directories watched at once (oldest dropped first)
+MAX_WATCHES = 64
+
+_EVENT = struct.Struct('iIII')
+
+def _load_libc():
+    """Load inotify functions from libc, None if unavailable"""
+    try:
+        import ctypes
+        import ctypes.util
+        
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except Exception:
+        return None
+
+def _errno():
+    """Last libc errno"""
+    import ctypes
+    return ctypes.get_errno()
+
+def get_fs_type(path):
+    """Get filesystem type of the mount holding path (from /proc/mounts)"""
+    path = os.path.realpath(path)
+    best, fs_type = "", None
+    
+    try:
+        with open("/proc/mounts", "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount_point = parts[1].replace('\\040', ' ')
+                prefix = mount_point.rstrip('/') + '/'
+                if (path == mount_point or path.startswith(prefix)) and \
+                   len(mount_point) > len(best):
+                    best, fs_type = mount_point, parts[2]
+    except:
+        pass
+    
+    return fs_type
+
+class DirectoryWatcher(threading.Thread):
+    """
+    Inotify-driven live invalidation
+    Patches SmartCache listings and the library index entry by entry
+    when files appear, finish recording or disappear in visited folders
+    
+    Directories on network filesystems are not watched; SmartCache
+    keeps validating those by directory mtime on every lookup.
+    """
+    
+    def __init__(self, cache, db=None, media_ext=MEDIA_EXTENSIONS, max_watches=MAX_WATCHES):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        
+        self.cache = cache
+        self.db = db
+        self.media_ext = media_ext
+        self.max_watches = max_watches
+        
+        self.libc = None
+        self.fd = -1
+        self.watches = OrderedDict()   # path -> wd
+        self.paths = {}                # wd -> path
+        self.signatures = {}           # path -> dir_signature() after the last event
+        self.devices = {}              # path -> st_dev when the watch was added
+        self.lock = threading.RLock()
+        self.stop_event = threading.Event()
+        self.patched = 0
+        
+        self._init_inotify()
+    
+    def _init_inotify(self):
+        """Create the inotify instance"""
+        libc = _load_libc()
+        if not libc:
+            return
+        
+        try:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except AttributeError:
+            return
+        
+        if fd < 0:
+            print(f"[Watch] inotify unavailable: {os.strerror(_errno())}")
+            return
+        
+        self.libc = libc
+        self.fd = fd
+    
+    def is_supported(self):
+        """Whether inotify is available on this box"""
+        return self.fd >= 0
+    
+    def watch(self, path):
+        """
+        Start watching a directory
+        
+        Returns:
+            True if watched, False if it falls back to mtime validation
+        """
+        if not self.is_supported():
+            return False
+        
+        with self.lock:
+            if path in self.watches:
+                self.watches.move_to_end(path)
+                return True
+        
+        fs_type = get_fs_type(path)
+        if fs_type is None or fs_type in NO_INOTIFY_FS or fs_type.startswith('fuse.'):
+            return False
+        
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            print(f"[Watch] Cannot watch {path}: {os.strerror(_errno())}")
+            return False
+        
+        # Taken after the watch exists, so any later change raises an event
+        signature = dir_signature(path)
+        try:
+            device = os.stat(path).st_dev
+        except OSError:
+            device = None
+        
+        with self.lock:
+            # inotify returns the same wd for a path watched twice
+            old = self.paths.get(wd)
+            if old:
+                self.watches.pop(old, None)
+                self.signatures.pop(old, None)
+                self.devices.pop(old, None)
+            
+            self.watches[path] = wd
+            self.paths[wd] = path
+            self.signatures[path] = signature
+            self.devices[path] = device
+            
+            while len(self.watches) > self.max_watches:
+                old_path, old_wd = self.watches.popitem(last=False)
+                self.paths.pop(old_wd, None)
+                self.signatures.pop(old_path, None)
+                self.devices.pop(old_path, None)
+                self.libc.inotify_rm_watch(self.fd, old_wd)
+        return True
+    
+    def run(self):
+        """Read and dispatch events"""
+        if not self.is_supported():
+            return
+        
+        while not self.stop_event.is_set():
+            try:
+                ready, _, _ = select.select([self.fd], [], [], 1.0)
+                if not ready:
+                    continue
+                data = os.read(self.fd, 64 * 1024)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EINTR):
+                    continue
+                break
+            except (ValueError, TypeError):
+                break
+            
+            self._dispatch(data)
+    
+    def _dispatch(self, data):
+        """Parse a buffer of inotify events"""
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            
+            try:
+                self._handle(wd, mask, os.fsdecode(name))
+            except Exception as e:
+                print(f"[Watch] Event error: {e}")
+    
+    def _handle(self, wd, mask, name):
+        """Apply one event to the cache and the index"""
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost - let mtime validation sort it out
+            with self.lock:
+                paths = list(self.watches)
+            for path in paths:
+                signature = dir_signature(path)
+                with self.lock:
+                    if path in self.watches:
+                        self.signatures[path] = signature
+                self.cache.invalidate_dir(path)
+            return
+        
+        with self.lock:
+            path = self.paths.get(wd)
+        if not path:
+            return
+        
+        if mask & DIR_GONE:
+            with self.lock:
+                self.watches.pop(path, None)
+                self.paths.pop(wd, None)
+                self.signatures.pop(path, None)
+                device = self.devices.pop(path, None)
+            if mask & IN_MOVE_SELF:
+                # The watch follows the moved inode, drop it
+                self.libc.inotify_rm_watch(self.fd, wd)
+            self.cache.invalidate_dir(path)
+            if self.db and mask & DIR_REMOVED and self._is_removed(path, device):
+                self.db.library.remove_dir(path)
+            return
+        
+        # Every event moves the signature on, even ignored ones, so a
+        # listing that missed a change is never re-signed as fresh
+        after = dir_signature(path)
+        with self.lock:
+            before = self.signatures.get(path)
+            if path in self.watches:
+                self.signatures[path] = after
+        
+        if not name or name.startswith('.'):
+            return
+        
+        full_path = os.path.join(path, name)
+        
+        if mask & ENTRY_REMOVED:
+            entry = None
+        elif mask & ENTRY_CHANGED:
+            entry = stat_entry(full_path, self.media_ext)
+            if entry is None:
+                return
+        else:
+            return
+        
+        if self.cache.patch_dir(path, name, entry, before, after):
+            self.patched += 1
+        
+        if self.db:
+            if not mask & IN_ISDIR:
+                self.db.library.patch_file(path, full_path, entry)
+            elif entry is None:
+                self.db.library.remove_dir(full_path)
+    
+    def _is_removed(self, path, device):
+        """
+        Whether a directory was really deleted or moved away
+        
+        The path must be ENOENT while its parent is still on the device
+        the directory was watched on, so a pulled or unmounted disk
+        keeps its index.
+        """
+        try:
+            os.stat(path)
+            return False
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                return False
+        
+        try:
+            return device is not None and os.stat(os.path.dirname(path)).st_dev == device
+        except OSError:
+            return False
+    
+    def stop(self):
+        """Stop watching and release the inotify instance"""
+        self.stop_event.set()
+        if self.fd >= 0:
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = -1
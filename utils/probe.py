@@ -0,0 +1,274 @@
+# ============================================================================
+# ModernMedia/utils/probe.py v5.0 - Media Probe Pipeline
+# ============================================================================
+
+import os
+import json
+import queue
+import subprocess
+import threading
+
+# Upper bound for concurrent ffprobe processes
+MAX_PROBE_WORKERS = 2
+
+# Results are written in one transaction per flush
+PROBE_FLUSH_INTERVAL = 1.0
+PROBE_FLUSH_SIZE = 50
+
+def default_probe_workers():
+    """One ffprobe per CPU, at most MAX_PROBE_WORKERS"""
+    return max(1, min(os.cpu_count() or 1, MAX_PROBE_WORKERS))
+
+def parse_probe(data):
+    """
+    Extract duration, resolution and codec from ffprobe JSON
+    
+    Returns:
+        dict with duration (seconds), resolution ("WxH") and codec,
+        values None when unknown
+    """
+    info = {'duration': None, 'resolution': None, 'codec': None}
+    
+    streams = [
+        s for s in data.get('streams', [])
+        if not s.get('disposition', {}).get('attached_pic')
+    ]
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+    
+    duration = data.get('format', {}).get('duration')
+    if duration is None and video:
+        duration = video.get('duration')
+    try:
+        duration = int(round(float(duration)))
+        info['duration'] = duration if duration > 0 else None
+    except (TypeError, ValueError):
+        pass
+    
+    if video:
+        if video.get('width') and video.get('height'):
+            info['resolution'] = f"{video['width']}x{video['height']}"
+        info['codec'] = video.get('codec_name')
+    elif audio:
+        info['codec'] = audio.get('codec_name')
+    
+    return info
+
+def probe_file(file_path, timeout=15):
+    """
+    Run ffprobe once (format and streams as JSON)
+    
+    Returns:
+        Parsed info (see parse_probe) or None if ffprobe failed
+    
+    Raises:
+        FileNotFoundError if ffprobe is not installed
+    """
+    try:
+        result = subprocess.run(
+            [
+                'ffprobe', '-v', 'error',
+                '-show_format', '-show_streams',
+                '-of', 'json',
+                file_path
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return None
+    
+    if result.returncode != 0:
+        return None
+    
+    try:
+        return parse_probe(json.loads(result.stdout.decode('utf-8', 'replace')))
+    except ValueError:
+        return None
+
+class MediaProber(threading.Thread):
+    """
+    Background metadata extraction into file_metadata
+    
+    Listings are handed over with submit(); files whose size and mtime
+    match the stored probe are skipped, the rest are probed by a small
+    pool of workers and written back in bulk. A new submit replaces the
+    files still waiting, so the folder on screen always goes first.
+    
+    Durations of every written batch are posted to the thread-safe
+    `updates` queue as {file_path: duration} for the UI to pick up.
+    """
+    
+    def __init__(self, db, workers=None):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        
+        self.db = db
+        self.worker_count = workers or default_probe_workers()
+        
+        self.incoming = None
+        self.pending = []
+        self.results = []
+        self.active = 0          # batches being filtered, probed or written
+        self.updates = queue.Queue()
+        self.condition = threading.Condition()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.stop_event = threading.Event()
+        self.available = True
+        self.workers = []
+        
+        self.probed = 0
+        self.skipped = 0
+    
+    def submit(self, files):
+        """
+        Queue files for probing
+        
+        Args:
+            files: iterable of (file_path, file_size, mtime)
+        """
+        if not self.available:
+            return
+        
+        with self.condition:
+            self.incoming = list(files)
+            self.condition.notify_all()
+    
+    def busy(self):
+        """True while files are waiting, being probed or not written yet"""
+        with self.condition:
+            return (self.incoming is not None or bool(self.pending) or
+                    bool(self.results) or self.active > 0)
+    
+    def get_updates(self):
+        """Drain durations written so far (non-blocking)"""
+        durations = {}
+        while True:
+            try:
+                durations.update(self.updates.get_nowait())
+            except queue.Empty:
+                return durations
+    
+    def pause(self):
+        """Yield to a foreground scan"""
+        self.idle.clear()
+    
+    def resume(self):
+        """Foreground scan finished"""
+        self.idle.set()
+    
+    def run(self):
+        """Filter submissions and flush results"""
+        for n in range(self.worker_count):
+            worker = threading.Thread(target=self._worker, name=f"Probe-{n}")
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+        
+        while not self.stop_event.is_set():
+            with self.condition:
+                if self.incoming is None:
+                    self.condition.wait(PROBE_FLUSH_INTERVAL)
+                files, self.incoming = self.incoming, None
+                if files is not None:
+                    self.active += 1
+            
+            if files is not None:
+                try:
+                    todo = self._filter(files)
+                except Exception as e:
+                    print(f"[Probe] Filter error: {e}")
+                    todo = []
+                with self.condition:
+                    self.pending = todo
+                    self.active -= 1
+                    self.condition.notify_all()
+            
+            self._flush()
+        
+        self._flush()
+    
+    def _filter(self, files):
+        """Drop files whose stored probe matches size and mtime"""
+        states = self.db.metadata.get_probe_states([f[0] for f in files])
+        
+        todo = []
+        for file_path, file_size, mtime in files:
+            if states.get(file_path) == (file_size, mtime):
+                self.skipped += 1
+            else:
+                todo.append((file_path, file_size, mtime))
+        return todo
+    
+    def _worker(self):
+        """Probe queued files one at a time"""
+        while not self.stop_event.is_set():
+            with self.condition:
+                while not self.pending and not self.stop_event.is_set():
+                    self.condition.wait()
+                if self.stop_event.is_set():
+                    return
+                file_path, file_size, mtime = self.pending.pop(0)
+                self.active += 1
+            
+            try:
+                self._probe(file_path, file_size, mtime)
+            finally:
+                with self.condition:
+                    self.active -= 1
+            
+            if not self.available:
+                return
+    
+    def _probe(self, file_path, file_size, mtime):
+        """Probe one file and collect the result"""
+        # Never compete with the foreground scanner
+        self.idle.wait()
+        
+        try:
+            info = probe_file(file_path)
+        except FileNotFoundError:
+            print("[Probe] ffprobe not found - metadata extraction disabled")
+            self.available = False
+            with self.condition:
+                self.pending = []
+            return
+        except Exception as e:
+            print(f"[Probe] Error in {file_path}: {e}")
+            return
+        
+        # Failed probes are stored too, so they are not retried
+        # until the file changes
+        info = dict(info or {}, file_path=file_path, file_size=file_size, mtime=mtime)
+        with self.condition:
+            self.results.append(info)
+            self.probed += 1
+            if len(self.results) >= PROBE_FLUSH_SIZE:
+                self.condition.notify_all()
+    
+    def _flush(self):
+        """Write collected results in one transaction"""
+        with self.condition:
+            results, self.results = self.results, []
+            if not results:
+                return
+            self.active += 1
+        
+        try:
+            if self.db.metadata.set_probe_many(results):
+                durations = {r['file_path']: r['duration'] for r in results if r.get('duration')}
+                if durations:
+                    self.updates.put(durations)
+        finally:
+            with self.condition:
+                self.active -= 1
+    
+    def stop(self):
+        """Stop probing (collected results are still written)"""
+        self.stop_event.set()
+        self.idle.set()
+        with self.condition:
+            self.pending = []
+            self.condition.notify_all()
@@ -4,13 +4,106 @@
 
 import os
 import stat
+import time
+import queue
 import threading
 from ..constants import MEDIA_EXTENSIONS
+from .cache import dir_signature
+
+# Streaming chunk sizes - small first chunk so the first screen shows fast
+FIRST_CHUNK_SIZE = 32
+CHUNK_SIZE = 256
+
+# Minimum seconds between two background prefetch listings
+PREFETCH_INTERVAL = 0.5
+
+def iter_directory(path, media_ext=MEDIA_EXTENSIONS, stop_event=None):
+    """
+    Iterate directories and media files in a single directory
+    
+    Entries are classified from the d_type returned by os.scandir, so
+    only media files pay for a stat (size and mtime are needed there).
+    Entries come in on-disk order, see scan_directory() for a sorted list.
+    
+    Args:
+        path: Directory to list
+        media_ext: Tuple of lowercase media extensions
+        stop_event: Optional threading.Event to abort early
+    
+    Yields:
+        (name, full_path, kind, size, mtime) where kind is 'dir' or
+        'file' and size/mtime are None for dirs
+    
+    Raises:
+        OSError if the directory itself cannot be read
+    """
+    with os.scandir(path) as it:
+        for entry in it:
+            # Check for stop signal
+            if stop_event is not None and stop_event.is_set():
+                break
+            
+            name = entry.name
+            
+            # Skip hidden files
+            if name.startswith('.'):
+                continue
+            
+            try:
+                # Directory (d_type, stat only for symlinks/DT_UNKNOWN)
+                if entry.is_dir():
+                    yield (name, entry.path, 'dir', None, None)
+                
+                # Media file - extension check first, it costs no syscall
+                elif name.lower().endswith(media_ext) and entry.is_file():
+                    stats = entry.stat()
+                    yield (name, entry.path, 'file', stats.st_size, stats.st_mtime)
+            except OSError:
+                continue
+
+def stat_entry(full_path, media_ext=MEDIA_EXTENSIONS):
+    """
+    Build a single iter_directory() tuple for one path
+    
+    Returns:
+        (name, full_path, kind, size, mtime) or None if the path is
+        hidden, gone or not a directory/media file
+    """
+    name = os.path.basename(full_path)
+    if not name or name.startswith('.'):
+        return None
+    
+    try:
+        stats = os.stat(full_path)
+    except OSError:
+        return None
+    
+    if stat.S_ISDIR(stats.st_mode):
+        return (name, full_path, 'dir', None, None)
+    if stat.S_ISREG(stats.st_mode) and name.lower().endswith(media_ext):
+        return (name, full_path, 'file', stats.st_size, stats.st_mtime)
+    return None
+
+def scan_directory(path, media_ext=MEDIA_EXTENSIONS, stop_event=None):
+    """
+    List directories and media files in a single directory
+    
+    Returns:
+        List of iter_directory() tuples sorted by name
+    """
+    entries = list(iter_directory(path, media_ext, stop_event))
+    entries.sort(key=lambda e: e[0])
+    return entries
 
 class DirectoryScanner(threading.Thread):
     """
     Threaded directory scanner
     Scans for media files and directories without blocking UI
+    
+    Items are published in chunks on the thread-safe `chunks` queue
+    while the scan runs, together with the probed durations of their
+    files; `results` holds the complete list once the thread has
+    finished.
     """
     
     def __init__(self, path, db=None, media_ext=MEDIA_EXTENSIONS, 
@@ -27,93 +120,116 @@ class DirectoryScanner(threading.Thread):
         self.results = None
         self.exception = None
         self.stop_event = threading.Event()
+        self.chunks = queue.Queue()
     
     def run(self):
         """Scan directory"""
-        # Check cache first
-        if self.cache and not self.search_query:
+        use_cache = self.cache and not self.search_query
+        items = []
+        
+        # Check cache first - it holds raw entries, resume points and
+        # favorites are always looked up fresh
+        if use_cache:
             cached = self.cache.get_dir(self.path)
             if cached:
-                self.results = cached
+                self._publish(cached, items)
+                self.results = items
                 return
         
-        items = []
+        entries = []
+        pending = []
+        chunk_size = FIRST_CHUNK_SIZE
+        signature = dir_signature(self.path) if use_cache else None
         
         try:
-            for item in sorted(os.listdir(self.path)):
-                # Check for stop signal
-                if self.stop_event.is_set():
-                    break
-                
-                # Handle bytes encoding
-                if isinstance(item, bytes):
-                    try:
-                        item = item.decode('utf-8')
-                    except:
-                        continue
-                
-                # Skip hidden files
-                if item.startswith('.'):
-                    continue
-                
-                full_path = os.path.join(self.path, item)
-                
-                # Get file stats
-                try:
-                    stats = os.stat(full_path)
-                except:
-                    continue
-                
-                # Directory
-                if stat.S_ISDIR(stats.st_mode):
-                    items.append((
-                        item,
-                        full_path,
-                        'dir',
-                        None,
-                        None,
-                        0
-                    ))
-                
-                # Media file
-                elif stat.S_ISREG(stats.st_mode) and item.lower().endswith(self.media_ext):
-                    resume_sec = 0
-                    is_fav = False
-                    
-                    # Get resume data
-                    if self.db:
-                        try:
-                            resume_data = self.db.resume.get(
-                                full_path, stats.st_size, stats.st_mtime
-                            )
-                            resume_sec = resume_data.get('position_seconds', 0) if resume_data else 0
-                            is_fav = self.db.favorites.is_favorite(full_path)
-                        except:
-                            pass
-                    
-                    # Build display name
-                    display = item
-                    if is_fav:
-                        display = "★ " + display
-                    
-                    items.append((
-                        display,
-                        full_path,
-                        'file',
-                        stats.st_size,
-                        stats.st_mtime,
-                        resume_sec
-                    ))
-        
+            for entry in iter_directory(self.path, self.media_ext, self.stop_event):
+                entries.append(entry)
+                pending.append(entry)
+                if len(pending) >= chunk_size:
+                    self._publish(pending, items)
+                    pending = []
+                    chunk_size = CHUNK_SIZE
+            
+            if pending:
+                self._publish(pending, items)
         except Exception as e:
             self.exception = e
         
-        # Cache results
-        if self.cache and not self.search_query:
-            self.cache.set_dir(self.path, items)
+        items.sort(key=lambda i: os.path.basename(i[1]))
+        
+        # Cache results (never a partial listing)
+        if use_cache and self.exception is None and not self.stop_event.is_set():
+            entries.sort(key=lambda e: e[0])
+            self.cache.set_dir(self.path, entries, signature)
         
         self.results = items
     
+    def _publish(self, entries, items):
+        """Build display items for a chunk and hand them to the UI"""
+        chunk = self._build_items(entries)
+        items.extend(chunk)
+        self.chunks.put((chunk, self._get_durations(chunk)))
+    
+    def _get_durations(self, chunk):
+        """Probed durations of the files in a chunk (one batched query)"""
+        if not self.db:
+            return {}
+        try:
+            return self.db.metadata.get_durations([i[1] for i in chunk if i[2] == 'file'])
+        except:
+            return {}
+    
+    def get_chunks(self):
+        """Drain all (items, durations) chunks published so far (non-blocking)"""
+        chunks = []
+        while True:
+            try:
+                chunks.append(self.chunks.get_nowait())
+            except queue.Empty:
+                return chunks
+    
+    def _build_items(self, entries):
+        """
+        Turn raw directory entries into display items
+        
+        Resume points and favorites are fetched with one batched
+        lookup each instead of two queries per file.
+        """
+        files = {
+            full_path: (size, mtime)
+            for name, full_path, kind, size, mtime in entries
+            if kind == 'file'
+        }
+        
+        resume = {}
+        favorites = set()
+        if self.db and files:
+            try:
+                resume = self.db.resume.get_many(files)
+                favorites = self.db.favorites.filter_favorites(list(files))
+            except:
+                pass
+        
+        items = []
+        for name, full_path, kind, size, mtime in entries:
+            # Directory
+            if kind == 'dir':
+                items.append((name, full_path, 'dir', None, None, 0))
+                continue
+            
+            # Media file
+            resume_data = resume.get(full_path)
+            resume_sec = resume_data.get('position_seconds', 0) if resume_data else 0
+            
+            # Build display name
+            display = name
+            if full_path in favorites:
+                display = "★ " + display
+            
+            items.append((display, full_path, 'file', size, mtime, resume_sec))
+        
+        return items
+    
     def stop(self):
         """Stop scanning"""
         self.stop_event.set()
@@ -121,3 +237,103 @@ class DirectoryScanner(threading.Thread):
     def is_alive(self):
         """Check if still running"""
         return threading.Thread.is_alive(self)
+
+class DirectoryPrefetcher(threading.Thread):
+    """
+    Low-priority background lister that warms SmartCache
+    
+    Only the latest request is kept, listings are rate-limited and the
+    worker stays paused while a foreground DirectoryScanner runs.
+    """
+    
+    def __init__(self, cache, media_ext=MEDIA_EXTENSIONS, interval=PREFETCH_INTERVAL):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        
+        self.cache = cache
+        self.media_ext = media_ext
+        self.interval = interval
+        
+        self.pending = []
+        self.condition = threading.Condition()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.cancel_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.current = None
+        self.last_run = 0
+        self.prefetched = 0
+    
+    def request(self, paths):
+        """Replace queued prefetches with paths (first = most wanted)"""
+        with self.condition:
+            self.pending = [p for p in paths if p != self.current]
+            if self.current not in paths:
+                self.cancel_event.set()
+            self.condition.notify()
+    
+    def cancel(self):
+        """Drop queued prefetches and abort the running one"""
+        with self.condition:
+            self.pending = []
+            self.cancel_event.set()
+    
+    def pause(self):
+        """Yield to a foreground scan"""
+        self.idle.clear()
+        self.cancel()
+    
+    def resume(self):
+        """Foreground scan finished"""
+        self.idle.set()
+    
+    def run(self):
+        """Prefetch loop"""
+        while not self.stop_event.is_set():
+            with self.condition:
+                while not self.pending and not self.stop_event.is_set():
+                    self.condition.wait()
+                if self.stop_event.is_set():
+                    return
+            
+            # Never compete with the foreground scanner
+            self.idle.wait()
+            
+            # Rate limit
+            delay = self.last_run + self.interval - time.time()
+            if delay > 0:
+                self.stop_event.wait(delay)
+            
+            with self.condition:
+                if not self.pending or not self.idle.is_set():
+                    continue
+                path = self.pending.pop(0)
+                self.current = path
+                self.cancel_event.clear()
+            
+            self._prefetch(path)
+            self.current = None
+            self.last_run = time.time()
+    
+    def _prefetch(self, path):
+        """List one directory into the cache"""
+        if self.cache.get_dir(path, record_stats=False) is not None:
+            return
+        
+        try:
+            signature = dir_signature(path)
+            entries = scan_directory(path, self.media_ext, self.cancel_event)
+        except OSError:
+            return
+        
+        if not self.cancel_event.is_set() and not self.stop_event.is_set():
+            self.cache.set_dir(path, entries, signature)
+            self.prefetched += 1
+    
+    def stop(self):
+        """Stop prefetching"""
+        self.stop_event.set()
+        self.idle.set()
+        with self.condition:
+            self.cancel_event.set()
+            self.condition.notify()
@@ -3,10 +3,72 @@
 # ============================================================================
 
 import os
+import time
+import json
+import heapq
 import hashlib
+import itertools
 import subprocess
 import threading
 from ..constants import THUMB_CACHE_DIR, THUMBNAIL_SIZE
+from .thumbstore import ThumbnailStore
+from .cache import BoundedLRU, estimate_size
+
+# Extraction modes
+THUMB_MODE_FAST = "fast"            # Nearest keyframe only
+THUMB_MODE_ACCURATE = "accurate"    # Exact frame, full decode
+
+# Frame position as a fraction of the duration, fallback in seconds
+THUMB_POSITION = 0.1
+THUMB_DEFAULT_TIMESTAMP = 60
+
+# Scheduler priorities (lower runs first)
+PRIORITY_CURRENT = 0    # Highlighted file
+PRIORITY_VISIBLE = 1    # Rows around the cursor
+PRIORITY_BATCH = 2      # Bulk generation
+
+# Who asked for a job: rows in view, an explicit user request, a batch
+SCOPE_VIEW = "view"
+SCOPE_PINNED = "pinned"
+SCOPE_BATCH = "batch"
+
+# Upper bound for concurrent FFmpeg processes on many-core boxes
+MAX_THUMB_WORKERS = 4
+
+# Written once the old flat cache has been moved into shard directories
+LAYOUT_MARKER = ".sharded"
+
+# Bytes sampled from each end of a file for content keys
+KEY_SAMPLE_SIZE = 64 * 1024
+
+# Content keys kept in memory for GUI-thread lookups (with size/mtime)
+KEY_CACHE_MAX = 8192
+KEY_CACHE_MAX_BYTES = 2 * 1024 * 1024
+
+# ffprobe results kept in memory (None = duration unknown)
+DURATION_CACHE_MAX = 4096
+DURATION_CACHE_MAX_BYTES = 1024 * 1024
+
+def default_worker_count():
+    """One worker per CPU, a single one on single-core boxes"""
+    return max(1, min(os.cpu_count() or 1, MAX_THUMB_WORKERS))
+
+def shard_path(cache_dir, key, ext=".jpg"):
+    """Two-level hex shard for a cache key: ab/cd/<key>.jpg"""
+    return os.path.join(cache_dir, key[:2], key[2:4], key + ext)
+
+def content_key(file_path, file_size, mtime):
+    """
+    Key from size, mtime and the first and last 64 KB of a file
+    Stays the same when the file is moved, changes when it is rewritten
+    """
+    digest = hashlib.md5(f"{file_size}:{int(mtime)}:".encode())
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(KEY_SAMPLE_SIZE))
+        if file_size > KEY_SAMPLE_SIZE:
+            f.seek(max(KEY_SAMPLE_SIZE, file_size - KEY_SAMPLE_SIZE))
+            digest.update(f.read(KEY_SAMPLE_SIZE))
+    return digest.hexdigest()
 
 class ThumbnailManager:
     """
@@ -14,11 +76,22 @@ class ThumbnailManager:
     Uses FFmpeg to extract video frames
     """
     
-    def __init__(self, cache_dir=THUMB_CACHE_DIR):
+    def __init__(self, cache_dir=THUMB_CACHE_DIR, mode=None, content_keys=False):
         self.cache_dir = cache_dir
+        self.mode = mode or THUMB_MODE_FAST
+        self.content_keys = content_keys
+        self.key_cache = BoundedLRU(KEY_CACHE_MAX, KEY_CACHE_MAX_BYTES)
+        self.duration_cache = BoundedLRU(DURATION_CACHE_MAX, DURATION_CACHE_MAX_BYTES)
+        self.timings = {}
         self.generating = set()
         self.lock = threading.RLock()
+        self.stop_event = threading.Event()
         self.setup_cache()
+        self.store = ThumbnailStore(self.cache_dir)
+        
+        self.migrated = os.path.exists(os.path.join(self.cache_dir, LAYOUT_MARKER))
+        if not self.migrated:
+            threading.Thread(target=self._migrate_flat, daemon=True).start()
     
     def setup_cache(self):
         """Setup cache directory"""
@@ -32,32 +105,147 @@ class ThumbnailManager:
             os.makedirs(self.cache_dir, exist_ok=True)
             print(f"[Thumbs] Fallback: {self.cache_dir}")
     
-    def get_thumb_path(self, video_path):
-        """Get thumbnail path for video"""
-        path_hash = hashlib.md5(video_path.encode()).hexdigest()
-        return os.path.join(self.cache_dir, f"{path_hash}.jpg")
+    def get_thumb_key(self, video_path, cached_only=False):
+        """
+        Cache key for a video
+        md5 of the path, or the content key when enabled (cached in the
+        store index, so only new or changed files are read)
+        
+        Content keys cost a stat, an index lookup and possibly two 64 KB
+        reads. GUI-thread callers pass cached_only=True: one stat, and
+        None for keys no worker has resolved for the current size/mtime.
+        """
+        if self.content_keys:
+            try:
+                st = os.stat(video_path)
+                state = (st.st_size, st.st_mtime)
+                with self.lock:
+                    cached = self.key_cache.get(video_path)
+                if cached and cached[:2] == state:
+                    return cached[2]
+                if cached_only:
+                    return None
+                
+                key = self.store.get_key(video_path, st.st_size, st.st_mtime)
+                if key is None:
+                    key = content_key(video_path, st.st_size, st.st_mtime)
+                    self.store.set_key(video_path, st.st_size, st.st_mtime, key)
+                with self.lock:
+                    self.key_cache.set(video_path, state + (key,), estimate_size(video_path) + 130)
+                return key
+            except OSError:
+                if cached_only:
+                    return None
+        return hashlib.md5(video_path.encode()).hexdigest()
+    
+    def get_thumb_path(self, video_path, cached_only=False):
+        """
+        Get thumbnail path for video (sharded by hash prefix)
+        None if cached_only and the content key is not resolved yet
+        """
+        key = self.get_thumb_key(video_path, cached_only)
+        if key is None:
+            return None
+        return shard_path(self.cache_dir, key)
     
-    def has_thumb(self, video_path):
-        """Check if thumbnail exists"""
-        return os.path.exists(self.get_thumb_path(video_path))
+    def has_thumb(self, video_path, cached_only=False):
+        """
+        Check if thumbnail exists (counts as an access for LRU)
+        cached_only: never read the video file (see get_thumb_key)
+        """
+        thumb_path = self.get_thumb_path(video_path, cached_only)
+        if thumb_path is None:
+            return False
+        if os.path.exists(thumb_path) or self._adopt_flat(thumb_path):
+            self.store.touch(thumb_path)
+            return True
+        return False
     
-    def generate(self, video_path, timestamp=60):
-        """Generate thumbnail using FFmpeg"""
-        thumb_path = self.get_thumb_path(video_path)
+    def _adopt_flat(self, thumb_path):
+        """Move a thumbnail from the old flat layout into its shard"""
+        if self.migrated:
+            return False
         
-        # Already exists
-        if os.path.exists(thumb_path):
-            return thumb_path
+        flat_path = os.path.join(self.cache_dir, os.path.basename(thumb_path))
+        try:
+            if os.path.exists(thumb_path):
+                # Already regenerated in the new layout
+                os.remove(flat_path)
+                self.store.remove(flat_path)
+                return False
+            os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+            os.rename(flat_path, thumb_path)
+        except OSError:
+            return False
         
-        # Check if already generating
+        self.store.rename(flat_path, thumb_path)
+        return True
+    
+    def _migrate_flat(self):
+        """One-time background move of the flat cache into shards"""
+        try:
+            with os.scandir(self.cache_dir) as it:
+                names = [e.name for e in it if e.name.endswith('.jpg') and e.is_file()]
+        except OSError:
+            return
+        
+        moved = 0
+        for name in names:
+            if self.stop_event.is_set():
+                return
+            if self._adopt_flat(shard_path(self.cache_dir, name[:-4])):
+                moved += 1
+        
+        try:
+            open(os.path.join(self.cache_dir, LAYOUT_MARKER), 'w').close()
+        except OSError:
+            return
+        self.migrated = True
+        if moved:
+            print(f"[Thumbs] Migrated {moved} thumbnails to sharded layout")
+    
+    def get_duration(self, video_path):
+        """Duration via ffprobe, run at most once per file (result cached)"""
         with self.lock:
-            if video_path in self.generating:
-                return None
-            self.generating.add(video_path)
+            if video_path in self.duration_cache:
+                return self.duration_cache.get(video_path)
         
+        duration = self.probe_duration(video_path)
+        with self.lock:
+            self.duration_cache.set(video_path, duration, estimate_size(video_path) + 28)
+        return duration
+    
+    def probe_duration(self, video_path):
+        """Get video duration in seconds via ffprobe, None if unknown"""
         try:
-            width, height = THUMBNAIL_SIZE
-            cmd = [
+            result = subprocess.run(
+                [
+                    'ffprobe', '-v', 'error',
+                    '-show_entries', 'format=duration',
+                    '-of', 'default=noprint_wrappers=1:nokey=1',
+                    video_path
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=10
+            )
+            duration = float(result.stdout.decode().strip())
+            return duration if duration > 0 else None
+        except Exception:
+            return None
+    
+    def pick_timestamp(self, duration):
+        """Frame position proportional to the duration (60s if unknown)"""
+        if not duration:
+            return THUMB_DEFAULT_TIMESTAMP
+        return max(0, min(duration * THUMB_POSITION, duration - 1))
+    
+    def _build_command(self, video_path, thumb_path, timestamp):
+        """FFmpeg command line for the configured mode"""
+        width, height = THUMBNAIL_SIZE
+        
+        if self.mode == THUMB_MODE_ACCURATE:
+            return [
                 'ffmpeg',
                 '-ss', str(timestamp),
                 '-i', video_path,
@@ -67,16 +255,66 @@ class ThumbnailManager:
                 thumb_path,
                 '-y'
             ]
+        
+        # Fast: decode keyframes only, grab the first one after the seek
+        # point and scale in the same filter graph
+        return [
+            'ffmpeg',
+            '-hide_banner', '-loglevel', 'error',
+            '-skip_frame', 'nokey',
+            '-ss', f'{timestamp:.1f}',
+            '-noaccurate_seek',
+            '-i', video_path,
+            '-an', '-sn', '-dn',
+            '-vf', f'scale={width}:{height}:flags=fast_bilinear',
+            '-frames:v', '1',
+            '-q:v', '5',
+            '-y',
+            thumb_path
+        ]
+    
+    def generate(self, video_path, timestamp=None, duration=None):
+        """
+        Generate thumbnail using FFmpeg
+        
+        Args:
+            video_path: Video file
+            timestamp: Frame position in seconds (default: proportional
+                       to the duration)
+            duration: Known duration, saves an ffprobe run (unknown
+                      durations are probed once and cached)
+        """
+        thumb_path = self.get_thumb_path(video_path)
+        
+        # Already exists
+        if os.path.exists(thumb_path) or self._adopt_flat(thumb_path):
+            return thumb_path
+        
+        # Check if already generating
+        with self.lock:
+            if video_path in self.generating:
+                return None
+            self.generating.add(video_path)
+        
+        started = time.time()
+        try:
+            os.makedirs(os.path.dirname(thumb_path), exist_ok=True)
+            if timestamp is None:
+                timestamp = self.pick_timestamp(duration or self.get_duration(video_path))
             
             result = subprocess.run(
-                cmd,
+                self._build_command(video_path, thumb_path, timestamp),
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
                 timeout=30
             )
             
             if result.returncode == 0 and os.path.exists(thumb_path):
-                print(f"[Thumbs] Generated: {os.path.basename(video_path)}")
+                self.store.add(thumb_path)
+                elapsed_ms = (time.time() - started) * 1000
+                self._record_timing(elapsed_ms)
+                print(f"[Thumbs] Generated ({self.mode}, {elapsed_ms:.0f} ms): "
+                      f"{os.path.basename(video_path)}")
                 return thumb_path
         
         except Exception as e:
@@ -88,6 +326,25 @@ class ThumbnailManager:
         
         return None
     
+    def _record_timing(self, elapsed_ms):
+        """Accumulate per-mode latency"""
+        with self.lock:
+            count, total = self.timings.get(self.mode, (0, 0.0))
+            self.timings[self.mode] = (count + 1, total + elapsed_ms)
+    
+    def get_timing_stats(self):
+        """
+        Get average generation latency per mode
+        
+        Returns:
+            dict of mode -> (count, average ms)
+        """
+        with self.lock:
+            return {
+                mode: (count, total / count)
+                for mode, (count, total) in self.timings.items() if count
+            }
+    
     def batch_generate(self, video_paths, progress_callback=None):
         """Generate thumbnails for multiple videos"""
         total = len(video_paths)
@@ -111,37 +368,358 @@ class ThumbnailManager:
         try:
             if os.path.exists(thumb_path):
                 os.remove(thumb_path)
+                self.store.remove(thumb_path)
                 return True
         except:
             pass
         return False
     
     def clear_cache(self):
-        """Clear all thumbnails"""
+        """Clear all thumbnails and their index entries (content keys and batch state are kept)"""
         try:
-            for file in os.listdir(self.cache_dir):
-                file_path = os.path.join(self.cache_dir, file)
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
+            for root, dirs, files in os.walk(self.cache_dir, topdown=False):
+                for file in files:
+                    if file.endswith('.jpg'):
+                        os.remove(os.path.join(root, file))
+                if root != self.cache_dir and not os.listdir(root):
+                    os.rmdir(root)
+            self.store.clear()
             return True
         except:
             return False
     
     def get_cache_size(self):
-        """Get total cache size in bytes"""
+        """Get total cache size in bytes (from the index, no stat calls)"""
+        return self.store.get_size()
+    
+    def get_cache_count(self):
+        """Get number of cached thumbnails (from the index)"""
+        return self.store.get_count()
+    
+    def close(self):
+        """Stop the migration and flush the cache index"""
+        self.stop_event.set()
+        self.store.close()
+
+class ThumbnailScheduler:
+    """
+    Bounded thumbnail worker pool fed by a priority queue
+    
+    Jobs are deduplicated per file (the best priority wins) and queued
+    jobs for rows that scrolled out of view can be cancelled, so holding
+    a key down never starts more than `workers` FFmpeg processes.
+    """
+    
+    def __init__(self, thumb_mgr, workers=None, duration_lookup=None):
+        """
+        Args:
+            thumb_mgr: ThumbnailManager that generates the images
+            workers: Pool size (default: one per CPU, capped)
+            duration_lookup: Optional callable(video_path) -> known
+                             duration or None, runs on the worker thread
+        """
+        self.thumb_mgr = thumb_mgr
+        self.workers = workers or default_worker_count()
+        self.duration_lookup = duration_lookup
+        
+        self.heap = []
+        self.jobs = {}
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.running = 0
+        
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"Thumbs-{n}")
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+    
+    def submit(self, video_path, priority=PRIORITY_VISIBLE, callback=None, pinned=False):
+        """
+        Queue a thumbnail job
+        
+        Args:
+            video_path: Video to generate a thumbnail for
+            priority: PRIORITY_CURRENT, PRIORITY_VISIBLE or PRIORITY_BATCH
+            callback: Optional callable(video_path, thumb_path or None),
+                      runs on the worker thread (no GUI calls); also
+                      called with None if the request is cancelled
+            pinned: Keep the request when its row scrolls out of view
+                    (explicit user requests)
+        """
+        if priority == PRIORITY_BATCH:
+            scope = SCOPE_BATCH
+        else:
+            scope = SCOPE_PINNED if pinned else SCOPE_VIEW
+        
+        with self.condition:
+            job = self.jobs.get(video_path)
+            requests = [(scope, callback)]
+            
+            if job:
+                if job['priority'] <= priority:
+                    if callback or (scope, None) not in job['requests']:
+                        job['requests'].extend(requests)
+                    return
+                # Re-queue with the better priority
+                job['cancelled'] = True
+                requests = job['requests'] + requests
+            
+            self._push(video_path, priority, requests)
+    
+    def _push(self, video_path, priority, requests):
+        """Queue a new job (caller holds the lock)"""
+        job = {
+            'path': video_path,
+            'priority': priority,
+            'requests': requests,     # (scope, callback or None)
+            'cancelled': False
+        }
+        self.jobs[video_path] = job
+        heapq.heappush(self.heap, (priority, next(self.counter), job))
+        self.condition.notify()
+    
+    def _strip(self, video_path, job, scope):
+        """
+        Remove the requests of one scope from a queued job (caller holds
+        the lock); the job is dropped once no request is left
+        
+        Returns:
+            Callbacks of the removed requests
+        """
+        removed = [cb for s, cb in job['requests'] if s == scope]
+        keep = [(s, cb) for s, cb in job['requests'] if s != scope]
+        if len(keep) == len(job['requests']):
+            return []
+        
+        if not keep:
+            job['cancelled'] = True
+            del self.jobs[video_path]
+        elif all(s == SCOPE_BATCH for s, _ in keep) and job['priority'] < PRIORITY_BATCH:
+            # Batch jobs that were bumped go back to batch priority
+            job['cancelled'] = True
+            self._push(video_path, PRIORITY_BATCH, keep)
+        else:
+            job['requests'] = keep
+        return [cb for cb in removed if cb]
+    
+    def _notify_cancelled(self, cancelled):
+        """Call back cancelled requests with no thumbnail (lock released)"""
+        for video_path, callback in cancelled:
+            try:
+                callback(video_path, None)
+            except Exception as e:
+                print(f"[Thumbs] Callback error: {e}")
+    
+    def cancel(self, video_path):
+        """Cancel a queued job (a running FFmpeg is left to finish)"""
+        with self.condition:
+            job = self.jobs.pop(video_path, None)
+            if not job:
+                return
+            job['cancelled'] = True
+            cancelled = [(video_path, cb) for _, cb in job['requests'] if cb]
+        self._notify_cancelled(cancelled)
+    
+    def set_visible(self, video_paths):
+        """Cancel queued view requests whose rows are no longer visible"""
+        visible = set(video_paths)
+        cancelled = []
+        with self.condition:
+            for path, job in list(self.jobs.items()):
+                if path not in visible:
+                    cancelled += [(path, cb) for cb in self._strip(path, job, SCOPE_VIEW)]
+        self._notify_cancelled(cancelled)
+    
+    def cancel_batch(self):
+        """Cancel all queued batch requests (merged view requests stay)"""
+        cancelled = []
+        with self.condition:
+            for path, job in list(self.jobs.items()):
+                cancelled += [(path, cb) for cb in self._strip(path, job, SCOPE_BATCH)]
+        self._notify_cancelled(cancelled)
+    
+    def pending_count(self):
+        """Number of queued jobs"""
+        with self.condition:
+            return len(self.jobs)
+    
+    def busy(self):
+        """True while jobs are queued or running (callbacks included)"""
+        with self.condition:
+            return bool(self.jobs) or self.running > 0
+    
+    def _worker(self):
+        """Run jobs in priority order"""
+        while True:
+            with self.condition:
+                while not self.heap and not self.stop_event.is_set():
+                    self.condition.wait()
+                if self.stop_event.is_set():
+                    return
+                
+                _, _, job = heapq.heappop(self.heap)
+                if job['cancelled']:
+                    continue
+                self.jobs.pop(job['path'], None)
+                self.running += 1
+            
+            try:
+                thumb = self.thumb_mgr.generate(
+                    job['path'], duration=self._known_duration(job['path'])
+                )
+                
+                for _, callback in job['requests']:
+                    if not callback:
+                        continue
+                    try:
+                        callback(job['path'], thumb)
+                    except Exception as e:
+                        print(f"[Thumbs] Callback error: {e}")
+            finally:
+                with self.condition:
+                    self.running -= 1
+    
+    def _known_duration(self, video_path):
+        """Stored duration, so generate() can skip ffprobe"""
+        if not self.duration_lookup:
+            return None
         try:
-            total = 0
-            for file in os.listdir(self.cache_dir):
-                file_path = os.path.join(self.cache_dir, file)
-                if os.path.isfile(file_path):
-                    total += os.path.getsize(file_path)
-            return total
-        except:
+            return self.duration_lookup(video_path)
+        except Exception:
+            return None
+    
+    def stop(self):
+        """Stop workers and drop queued jobs"""
+        with self.condition:
+            self.stop_event.set()
+            self.heap = []
+            self.jobs.clear()
+            self.condition.notify_all()
+
+class ThumbnailBatch:
+    """
+    Cancellable bulk thumbnail generation
+    Runs on a ThumbnailScheduler at batch priority (its worker count is
+    the parallelism) and keeps the remaining files in a small state file
+    so an interrupted batch resumes after a plugin restart
+    """
+    
+    # Rewrite the state file after this many finished jobs
+    SAVE_EVERY = 10
+    
+    def __init__(self, scheduler, state_file=None):
+        self.scheduler = scheduler
+        self.state_file = state_file or os.path.join(
+            scheduler.thumb_mgr.cache_dir, "batch_pending.json"
+        )
+        self.lock = threading.RLock()
+        self.remaining = set()
+        self.total = 0
+        self.done = 0
+        self.generated = 0
+        self.running = False
+    
+    def start(self, video_paths):
+        """
+        Queue thumbnails for all videos that do not have one yet
+        
+        Returns:
+            Number of queued files
+        """
+        # Unresolved content keys count as missing, the worker finds
+        # an existing thumbnail without running FFmpeg
+        todo = [p for p in video_paths
+                if not self.scheduler.thumb_mgr.has_thumb(p, cached_only=True)]
+        
+        with self.lock:
+            if not self.running:
+                self._reset()
+            for path in todo:
+                if path not in self.remaining:
+                    self.remaining.add(path)
+                    self.total += 1
+            self.running = bool(self.remaining)
+            self._save()
+        
+        for path in todo:
+            self.scheduler.submit(path, PRIORITY_BATCH, self._job_done)
+        
+        return len(todo)
+    
+    def resume_pending(self):
+        """Continue a batch left over from the previous session"""
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                pending = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        
+        pending = [p for p in pending if os.path.exists(p)]
+        if not pending:
+            self._remove_state()
             return 0
+        
+        print(f"[Thumbs] Resuming batch: {len(pending)} left")
+        return self.start(pending)
     
-    def get_cache_count(self):
-        """Get number of cached thumbnails"""
+    def cancel(self):
+        """Cancel the batch (a running FFmpeg is left to finish)"""
+        with self.lock:
+            self.remaining.clear()
+            self.running = False
+            self._reset()
+        self._remove_state()
+        self.scheduler.cancel_batch()
+    
+    def get_progress(self):
+        """Get (done, total, generated, running)"""
+        with self.lock:
+            return self.done, self.total, self.generated, self.running
+    
+    def _job_done(self, video_path, thumb):
+        """Scheduler callback"""
+        with self.lock:
+            if video_path not in self.remaining:
+                return
+            
+            self.remaining.discard(video_path)
+            self.done += 1
+            if thumb:
+                self.generated += 1
+            
+            if not self.remaining:
+                self.running = False
+                self._remove_state()
+            elif self.done % self.SAVE_EVERY == 0:
+                self._save()
+    
+    def _reset(self):
+        """Reset counters (caller holds the lock)"""
+        self.total = 0
+        self.done = 0
+        self.generated = 0
+    
+    def _save(self):
+        """Persist remaining files (caller holds the lock)"""
+        if not self.remaining:
+            self._remove_state()
+            return
+        
+        try:
+            tmp = self.state_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(sorted(self.remaining), f)
+            os.replace(tmp, self.state_file)
+        except Exception as e:
+            print(f"[Thumbs] Batch state error: {e}")
+    
+    def _remove_state(self):
+        """Delete the state file"""
         try:
-            return len([f for f in os.listdir(self.cache_dir) if f.endswith('.jpg')])
+            if os.path.exists(self.state_file):
+                os.remove(self.state_file)
         except:
-            return 0
+            pass
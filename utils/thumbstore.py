@@ -0,0 +1,308 @@
+# ============================================================================
+# ModernMedia/utils/thumbstore.py v5.0 - Thumbnail Store Index
+# ============================================================================
+
+import os
+import time
+import sqlite3
+import threading
+from ..constants import THUMB_CACHE_MAX_BYTES
+
+class ThumbnailStore:
+    """
+    Manifest of the thumbnail cache
+    Tracks size and last access of every image in a small SQLite index,
+    keeps running totals in memory and evicts least recently used
+    images once the byte budget is exceeded
+    """
+    
+    def __init__(self, cache_dir, max_bytes=THUMB_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.conn = None
+        self.lock = threading.RLock()
+        
+        self.total_bytes = 0
+        self.count = 0
+        self.evictions = 0
+        self.touched = {}
+        
+        self.open()
+    
+    def open(self):
+        """Open the index and load totals"""
+        try:
+            self.conn = sqlite3.connect(
+                os.path.join(self.cache_dir, "index.db"), check_same_thread=False
+            )
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = OFF")
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS thumbs (
+                    name TEXT PRIMARY KEY,
+                    size INTEGER,
+                    last_access REAL
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_thumbs_access ON thumbs(last_access)')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS content_keys (
+                    file_path TEXT PRIMARY KEY,
+                    file_size INTEGER,
+                    mtime REAL,
+                    thumb_key TEXT
+                )
+            ''')
+            self.conn.commit()
+            
+            self._load_totals()
+            if not self.count:
+                self.rebuild()
+        except Exception as e:
+            print(f"[Thumbs] Index error: {e}")
+            self.conn = None
+    
+    def _load_totals(self):
+        """Read count and size once"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM thumbs"
+            ).fetchone()
+            self.count, self.total_bytes = row
+    
+    def rebuild(self):
+        """Index images already on disk (first run or lost index)"""
+        if not self.conn:
+            return 0
+        
+        rows = []
+        for root, dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.jpg'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                rows.append((self.name_for(path), st.st_size, st.st_mtime))
+        
+        if rows:
+            with self.lock:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO thumbs (name, size, last_access) VALUES (?, ?, ?)",
+                    rows
+                )
+                self.conn.commit()
+                self._load_totals()
+            print(f"[Thumbs] Indexed {len(rows)} cached images")
+            self.enforce_budget()
+        return len(rows)
+    
+    def name_for(self, thumb_path):
+        """Index key of an image (path relative to the cache dir)"""
+        return os.path.relpath(thumb_path, self.cache_dir)
+    
+    def add(self, thumb_path):
+        """Register a newly written image and enforce the budget"""
+        if not self.conn:
+            return
+        
+        try:
+            size = os.path.getsize(thumb_path)
+        except OSError:
+            return
+        
+        name = self.name_for(thumb_path)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size FROM thumbs WHERE name = ?", (name,)
+            ).fetchone()
+            if row:
+                self.total_bytes -= row[0]
+            else:
+                self.count += 1
+            self.total_bytes += size
+            
+            self.conn.execute(
+                "INSERT OR REPLACE INTO thumbs (name, size, last_access) VALUES (?, ?, ?)",
+                (name, size, time.time())
+            )
+            self.touched.pop(name, None)
+            # Buffered accesses ride along on this (worker thread) commit
+            self._write_touched()
+            self.conn.commit()
+        
+        self.enforce_budget()
+    
+    def touch(self, thumb_path):
+        """
+        Record an access (memory only, safe on the GUI thread)
+        
+        Buffered access times are written with the next add(), before
+        an eviction and on close().
+        """
+        if not self.conn:
+            return
+        
+        with self.lock:
+            self.touched[self.name_for(thumb_path)] = time.time()
+    
+    def _write_touched(self):
+        """Write buffered access times without committing (caller holds the lock)"""
+        if not self.touched:
+            return
+        try:
+            self.conn.executemany(
+                "UPDATE thumbs SET last_access = ? WHERE name = ?",
+                [(t, name) for name, t in self.touched.items()]
+            )
+        except Exception as e:
+            print(f"[Thumbs] Index flush error: {e}")
+        self.touched.clear()
+    
+    def flush(self):
+        """Write buffered access times"""
+        if not self.conn:
+            return
+        
+        with self.lock:
+            if not self.touched:
+                return
+            self._write_touched()
+            self.conn.commit()
+    
+    def remove(self, thumb_path):
+        """Forget an image (the caller deletes the file)"""
+        if not self.conn:
+            return
+        
+        name = self.name_for(thumb_path)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size FROM thumbs WHERE name = ?", (name,)
+            ).fetchone()
+            if not row:
+                return
+            self.conn.execute("DELETE FROM thumbs WHERE name = ?", (name,))
+            self.conn.commit()
+            self.touched.pop(name, None)
+            self.count -= 1
+            self.total_bytes -= row[0]
+    
+    def rename(self, old_path, new_path):
+        """Follow an image that moved inside the cache"""
+        if not self.conn:
+            return
+        
+        old, new = self.name_for(old_path), self.name_for(new_path)
+        with self.lock:
+            cur = self.conn.execute(
+                "UPDATE thumbs SET name = ? WHERE name = ?", (new, old)
+            )
+            self.conn.commit()
+            moved = cur.rowcount > 0
+            if old in self.touched:
+                self.touched[new] = self.touched.pop(old)
+        
+        if not moved:
+            self.add(new_path)
+    
+    def get_key(self, file_path, file_size, mtime):
+        """Cached content key of a file, None if unknown or outdated"""
+        if not self.conn:
+            return None
+        
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT file_size, mtime, thumb_key FROM content_keys WHERE file_path = ?",
+                (file_path,)
+            ).fetchone()
+        
+        if row and row[0] == file_size and row[1] == mtime:
+            return row[2]
+        return None
+    
+    def set_key(self, file_path, file_size, mtime, thumb_key):
+        """Remember the content key of a file"""
+        if not self.conn:
+            return
+        
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO content_keys (file_path, file_size, mtime, thumb_key) "
+                "VALUES (?, ?, ?, ?)",
+                (file_path, file_size, mtime, thumb_key)
+            )
+            self.conn.commit()
+    
+    def enforce_budget(self):
+        """
+        Evict least recently used images until under the byte budget
+        
+        Returns:
+            Number of evicted images
+        """
+        if not self.conn or self.total_bytes <= self.max_bytes:
+            return 0
+        
+        evicted = 0
+        with self.lock:
+            self.flush()
+            
+            while self.total_bytes > self.max_bytes:
+                rows = self.conn.execute(
+                    "SELECT name, size FROM thumbs ORDER BY last_access LIMIT 50"
+                ).fetchall()
+                if not rows:
+                    break
+                
+                victims = []
+                for name, size in rows:
+                    if self.total_bytes <= self.max_bytes:
+                        break
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+                    victims.append((name,))
+                    self.total_bytes -= size
+                    self.count -= 1
+                
+                self.conn.executemany("DELETE FROM thumbs WHERE name = ?", victims)
+                self.conn.commit()
+                evicted += len(victims)
+        
+        self.evictions += evicted
+        print(f"[Thumbs] Evicted {evicted} images")
+        return evicted
+    
+    def clear(self):
+        """Forget all images"""
+        if not self.conn:
+            return
+        
+        with self.lock:
+            self.conn.execute("DELETE FROM thumbs")
+            self.conn.commit()
+            self.touched.clear()
+            self.count = 0
+            self.total_bytes = 0
+    
+    def get_size(self):
+        """Total cached bytes (O(1))"""
+        return self.total_bytes
+    
+    def get_count(self):
+        """Number of cached images (O(1))"""
+        return self.count
+    
+    def close(self):
+        """Flush and close the index"""
+        try:
+            if self.conn:
+                self.flush()
+                self.conn.close()
+                self.conn = None
+        except:
+            pass